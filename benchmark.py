@@ -0,0 +1,211 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Benchmark of all SudokuAI variants on a fixed corpus of positions.
+#
+# Every variant searches every position of the corpus in its own process, with
+# propose_move replaced by a stub that records the proposals, and is stopped at
+# the time limit like in a real game. Per run the report contains
+#   - the time to the first proposal,
+#   - nodes/sec and the depth reached (for the variants that search with
+#     AlphaBetaSearch; read from the iterations of its TimeManager),
+#   - the peak resident memory of the process,
+#   - the last proposed move.
+# The report is written as JSON. Given a previous report as --baseline, runs
+# whose nodes/sec or time to the first proposal got worse by more than
+# --threshold, or that reach a smaller depth, are listed as regressions and the
+# script exits with status 1. Timings on a busy machine are noisy; --repeat
+# runs every benchmark several times and keeps the best run.
+#
+# Run it from the directory with simulate_game.py, with this team folder as a package:
+#   python -m team05_A1_v2.benchmark --seconds 1 --output bench.json
+#   python -m team05_A1_v2.benchmark --seconds 1 --baseline bench.json --threshold 0.1
+
+import argparse
+import importlib.machinery
+import importlib.util
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import time
+
+from .positions import random_position
+from .time_manager import TimeManager
+
+# the engine variants of this team, as files in this folder
+VARIANTS = ["sudokuai.py", "final_A2.py", "sudokuai_x-wing.py", "sudokuai_flll_region.py", "sudokuai_Roelle"]
+
+# block shapes (m, n) and fill levels of the corpus
+SHAPES = [(2, 2), (2, 3), (3, 3), (3, 4), (4, 4)]
+PHASES = {"opening": 0.15, "middle": 0.5, "endgame": 0.8}
+
+
+def corpus():
+    """ Returns the benchmark positions as (name, game_state) pairs """
+    return [(f"{m}x{n}-{phase}", random_position(m, n, fill, seed=1))
+            for (m, n) in SHAPES for (phase, fill) in PHASES.items()]
+
+
+def load_variant(filename: str):
+    """ Imports a variant file of this folder as a module of this package """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    name = f"{__package__}.{os.path.splitext(filename)[0].replace('-', '_')}"
+    loader = importlib.machinery.SourceFileLoader(name, path)
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader(name, loader))
+    loader.exec_module(module)
+    return module
+
+
+# slots of the shared array a run reports in; -1 means "not measured"
+FIRST_PROPOSAL, MOVE_I, MOVE_J, MOVE_VALUE, DEPTH, NODES, ITERATION_TIME, COMPLETED_RSS = range(8)
+
+
+def run_variant(filename: str, game_state, seconds: float, report, errors, attributes: dict = None) -> None:
+    """ Runs compute_best_move of a variant in this process, writing the measurements to report;
+        attributes are set on the SudokuAI before it starts
+    """
+    try:
+        module = load_variant(filename)
+        ai = module.SudokuAI()
+        if hasattr(ai, "time_budget"):
+            ai.time_budget = seconds
+        # every run starts from scratch, without the search memory of an earlier run (see search_memory.py)
+        if hasattr(ai, "persistent"):
+            ai.persistent = False
+        for (name, value) in (attributes or {}).items():
+            setattr(ai, name, value)
+        start = time.perf_counter()
+
+        def propose_move(move):
+            if report[FIRST_PROPOSAL] < 0:
+                report[FIRST_PROPOSAL] = time.perf_counter() - start
+            report[MOVE_I], report[MOVE_J], report[MOVE_VALUE] = move.i, move.j, move.value
+
+        original_iteration_done = TimeManager.iteration_done
+
+        def iteration_done(manager, nodes):
+            original_iteration_done(manager, nodes)
+            report[ITERATION_TIME] = time.perf_counter() - start
+            report[DEPTH], report[NODES] = len(manager.iterations), nodes
+
+        TimeManager.iteration_done = iteration_done
+        ai.propose_move = propose_move
+        ai.compute_best_move(game_state)
+        report[COMPLETED_RSS] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception as exception:
+        errors.put(f"{type(exception).__name__}: {exception}")
+
+
+def peak_rss(pid: int):
+    """ Returns the peak resident memory in kB of a running process, or None if it cannot be read """
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def benchmark(filename: str, position: str, game_state, seconds: float, attributes: dict = None) -> dict:
+    """ Runs a variant on a position with the time limit and returns the measurements """
+    # like the framework, the process reports through shared memory, which stays readable when it is killed
+    report = multiprocessing.RawArray("d", [-1.0] * 8)
+    errors = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_variant,
+                                      args=(filename, game_state, seconds, report, errors, attributes), daemon=True)
+    process.start()
+    process.join(seconds)
+    rss = None
+    if process.is_alive():
+        rss = peak_rss(process.pid)
+        process.terminate()
+        process.join()
+
+    completed = report[COMPLETED_RSS] >= 0
+    error = None
+    try:
+        error = errors.get(timeout=0.1) if not completed and process.exitcode == 0 else None
+    except queue.Empty:
+        pass
+    nodes = int(report[NODES]) if report[NODES] >= 0 else None
+    return {"variant": filename, "position": position, "seconds": seconds,
+            "time_to_first_proposal": report[FIRST_PROPOSAL] if report[FIRST_PROPOSAL] >= 0 else None,
+            "nodes": nodes,
+            "nodes_per_second": nodes / report[ITERATION_TIME] if nodes is not None and report[ITERATION_TIME] > 0
+            else None,
+            "depth": int(report[DEPTH]) if report[DEPTH] >= 0 else None,
+            "peak_rss_kb": int(report[COMPLETED_RSS]) if completed else rss,
+            "final_move": [int(report[MOVE_I]), int(report[MOVE_J]), int(report[MOVE_VALUE])]
+            if report[MOVE_VALUE] >= 0 else None,
+            "completed": completed, "error": error}
+
+
+def regressions(results, baseline, threshold: float) -> list:
+    """ Returns descriptions of the runs that got worse than the same run in baseline """
+    previous = {(run["variant"], run["position"]): run for run in baseline["results"]}
+    found = []
+    for run in results:
+        before = previous.get((run["variant"], run["position"]))
+        if before is None:
+            continue
+        name = f"{run['variant']} {run['position']}"
+        if before["nodes_per_second"] and run["nodes_per_second"] is not None \
+                and run["nodes_per_second"] < before["nodes_per_second"] * (1 - threshold):
+            found.append(f"{name}: nodes/sec {before['nodes_per_second']:.0f} -> {run['nodes_per_second']:.0f}")
+        if before["depth"] is not None and run["depth"] is not None and run["depth"] < before["depth"]:
+            found.append(f"{name}: depth {before['depth']} -> {run['depth']}")
+        if before["time_to_first_proposal"] is not None and run["time_to_first_proposal"] is not None \
+                and run["time_to_first_proposal"] > before["time_to_first_proposal"] * (1 + threshold) + 0.001:
+            found.append(f"{name}: time to first proposal {before['time_to_first_proposal']:.4f} "
+                         f"-> {run['time_to_first_proposal']:.4f}")
+        if before["error"] is None and run["error"] is not None:
+            found.append(f"{name}: {run['error']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the SudokuAI variants on a fixed corpus of positions")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time limit per move")
+    parser.add_argument("--variants", nargs="+", default=VARIANTS, help="variant files to benchmark")
+    parser.add_argument("--output", default="benchmark_report.json", help="JSON report to write")
+    parser.add_argument("--baseline", help="previous JSON report to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown counted as a regression")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per variant and position; the best run is kept")
+    args = parser.parse_args()
+
+    results = []
+    for (position, game_state) in corpus():
+        for filename in args.variants:
+            # timings are noisy: keep the run that got deepest and fastest
+            result = max((benchmark(filename, position, game_state, args.seconds) for _ in range(args.repeat)),
+                         key=lambda run: (run["depth"] or 0, run["nodes_per_second"] or 0))
+            results.append(result)
+            nps = f"{result['nodes_per_second']:.0f}" if result["nodes_per_second"] is not None else "-"
+            first = f"{result['time_to_first_proposal']:.4f}" if result["time_to_first_proposal"] is not None else "-"
+            print(f"{filename:>24} {position:>12} first {first:>7} nodes/sec {nps:>8} depth {result['depth']} "
+                  f"rss {result['peak_rss_kb']} move {result['final_move']}"
+                  + (f" error {result['error']}" if result["error"] else ""))
+
+    report = {"seconds": args.seconds, "repeat": args.repeat, "results": results}
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        found = regressions(results, baseline, args.threshold)
+        for line in found:
+            print(f"regression: {line}")
+        if found:
+            raise SystemExit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Offline builder of the opening book (see opening_book.py).
+#
+# Searches the starting positions of the given board files deeply and writes
+# the best move of each of them to the book. With --replies the positions after
+# every first move of the opponent are searched as well (with --reply-seconds
+# each), so the book also answers when we play second. Entries already in the
+# book are kept unless the new search went deeper.
+#
+# Run it from the directory with simulate_game.py, with this team folder as a package:
+#   python -m team05_A1_v2.build_book boards/*.txt --seconds 60
+
+import argparse
+import copy
+
+from competitive_sudoku.sudoku import GameState, Move, load_sudoku_from_text
+from .opening_book import BOOK_FILE, OpeningBook, write_book
+from .search import AlphaBetaSearch
+from .search_state import SearchState
+from .symmetry import board_symmetry
+
+
+def search_position(game_state: GameState, seconds: float):
+    """ Returns the book entry (key, (cell, value, depth, score)) of a position, or None if it has no moves """
+    search = AlphaBetaSearch(lambda i, j, value: None, seconds)
+    search.minimax(game_state)
+    # the move, depth and value of the deepest completed depth belong together; the move minimax returns may come
+    # from a depth that ran out of time
+    best_move = search.depth_move
+    if best_move is None:
+        return None
+    state = SearchState(game_state)
+    # the score is stored relative to the current scores of the position
+    player = state.ply % 2
+    score = search.value - (state.scores[player] - state.scores[1 - player])
+    # the book is keyed on the canonical form of the board, so symmetric positions share their entry
+    symmetry = board_symmetry(state.geometry.m, state.geometry.n)
+    key, transform = symmetry.board_key(state.squares, state.ply)
+    cell, value = symmetry.to_canonical(best_move, transform)
+    return key, (cell, value, search.depth, score)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds the opening book from starting positions")
+    parser.add_argument("boards", nargs="+", help="board files with the starting positions")
+    parser.add_argument("--seconds", type=float, default=60.0, help="search time per starting position")
+    parser.add_argument("--replies", action="store_true", help="also search the positions after every first move")
+    parser.add_argument("--reply-seconds", type=float, default=5.0, help="search time per position after a first move")
+    parser.add_argument("--output", default=BOOK_FILE, help="book file to write (existing entries are merged)")
+    args = parser.parse_args()
+
+    try:
+        book = OpeningBook(args.output)
+        entries = book.entries()
+        book.close()
+    except (OSError, ValueError):
+        entries = {}
+
+    def add(game_state: GameState, seconds: float):
+        result = search_position(game_state, seconds)
+        if result is None:
+            return
+        key, entry = result
+        if key not in entries or entries[key][2] <= entry[2]:
+            entries[key] = entry
+
+    for filename in args.boards:
+        with open(filename) as file:
+            board = load_sudoku_from_text(file.read())
+        game_state = GameState(copy.deepcopy(board), copy.deepcopy(board), [], [], [0, 0])
+        add(game_state, args.seconds)
+        print(f"{filename}: {len(entries)} entries")
+
+        if args.replies:
+            state = SearchState(game_state)
+            for (k, value) in state.legal_moves():
+                reply_state = copy.deepcopy(game_state)
+                i, j = state.geometry.cell_coordinates[k]
+                reply_state.board.put(i, j, value)
+                reply_state.moves.append(Move(i, j, value))
+                reply_state.scores[0] += state.points(k)
+                add(reply_state, args.reply_seconds)
+            print(f"{filename} with replies: {len(entries)} entries")
+
+    write_book(args.output, entries)
+    print(f"wrote {len(entries)} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
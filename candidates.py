@@ -0,0 +1,105 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Bitset candidate engine for legal-move generation.
+#
+# Every row, column and block keeps one integer mask of the values that are
+# already used in it; bit (value - 1) is set when value is present. The legal
+# values of an empty cell are then ~(row | column | block | taboo) & full, so
+# generating all moves of a position only costs a few integer operations per
+# cell instead of building a set of values per (cell, value) pair. The taboo
+# moves are a mask per cell as well, and the board is a bytearray.
+
+from .geometry import BoardGeometry
+
+
+# mask -> tuple of values, filled lazily (at most 2**N entries per board size)
+_mask_values = {}
+
+
+def mask_values(mask: int) -> tuple:
+    """ Returns the values whose bits are set in mask, in increasing order """
+    values = _mask_values.get(mask)
+    if values is None:
+        values, rest = [], mask
+        while rest:
+            low = rest & -rest
+            values.append(low.bit_length())
+            rest ^= low
+        values = _mask_values[mask] = tuple(values)
+    return values
+
+
+class CandidateEngine(object):
+    """
+    Board plus per-region masks of used values, kept in sync by place() / remove().
+    Moves are (k, value) pairs with k the flat cell index of the geometry.
+    """
+    __slots__ = ("geometry", "full", "squares", "row_used", "col_used", "block_used", "taboo")
+
+    def __init__(self, geometry: BoardGeometry, squares, taboo_moves=()):
+        N = geometry.N
+        self.geometry = geometry
+        self.full = (1 << N) - 1  # mask with all N values set
+        self.squares = bytearray(squares)  # one byte per cell, 0 for empty
+        self.row_used = [0] * N
+        self.col_used = [0] * N
+        self.block_used = [0] * N
+
+        # taboo moves are masked out per cell, so checking a move against them is a single AND
+        self.taboo = [0] * geometry.size
+        for move in taboo_moves:
+            self.taboo[geometry.index(move.i, move.j)] |= 1 << (move.value - 1)
+
+        cell_row, cell_col, cell_block = geometry.cell_row, geometry.cell_col, geometry.cell_block
+        for k, value in enumerate(self.squares):
+            if value:
+                bit = 1 << (value - 1)
+                self.row_used[cell_row[k]] |= bit
+                self.col_used[cell_col[k]] |= bit
+                self.block_used[cell_block[k]] |= bit
+
+    def place(self, k: int, value: int) -> None:
+        """ Writes value in the empty cell k """
+        geometry = self.geometry
+        bit = 1 << (value - 1)
+        self.squares[k] = value
+        self.row_used[geometry.cell_row[k]] |= bit
+        self.col_used[geometry.cell_col[k]] |= bit
+        self.block_used[geometry.cell_block[k]] |= bit
+
+    def remove(self, k: int) -> None:
+        """ Empties cell k again (the inverse of place) """
+        geometry = self.geometry
+        bit = 1 << (self.squares[k] - 1)
+        self.squares[k] = 0
+        self.row_used[geometry.cell_row[k]] &= ~bit
+        self.col_used[geometry.cell_col[k]] &= ~bit
+        self.block_used[geometry.cell_block[k]] &= ~bit
+
+    def candidates(self, k: int) -> int:
+        """ Returns the mask of values that can legally be written in cell k """
+        if self.squares[k]:
+            return 0
+        geometry = self.geometry
+        return ~(self.row_used[geometry.cell_row[k]] | self.col_used[geometry.cell_col[k]]
+                 | self.block_used[geometry.cell_block[k]] | self.taboo[k]) & self.full
+
+    def legal_moves(self) -> list:
+        """ Returns all legal moves of the position as (k, value) pairs, ordered by cell and value """
+        geometry = self.geometry
+        squares, taboo, full = self.squares, self.taboo, self.full
+        row_used, col_used, block_used = self.row_used, self.col_used, self.block_used
+        cell_row, cell_col, cell_block = geometry.cell_row, geometry.cell_col, geometry.cell_block
+
+        moves = []
+        for k in range(geometry.size):
+            if squares[k]:
+                continue
+            mask = ~(row_used[cell_row[k]] | col_used[cell_col[k]] | block_used[cell_block[k]] | taboo[k]) & full
+            values = _mask_values.get(mask)
+            if values is None:
+                values = mask_values(mask)
+            moves += [(k, value) for value in values]
+        return moves
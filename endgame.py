@@ -0,0 +1,155 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Exact endgame solver.
+#
+# With few empty squares left the rest of the game can be searched to the end.
+# The solver works on the empty squares only:
+#   - the candidates of the empty squares are bitmasks (bit v-1 for value v),
+#     updated incrementally when a value is placed in a square that shares a
+#     region with them,
+#   - the position is one integer: the value placed in empty square i is
+#     stored in the bits [i * width, (i + 1) * width); the player to move
+#     follows from the number of placed values, so the integer identifies the
+#     position exactly,
+#   - negamax with alpha-beta gives the points the player to move can still
+#     gain over the opponent; the results are memoized in a dictionary keyed on
+#     the position integer, with the bound type of the value.
+# Like in the alpha-beta search, the game ends when no legal move is left.
+#
+# ENDGAME_THRESHOLDS holds the number of empty squares up to which the solver
+# finished within half a second on every test position of a board size; they
+# were measured with endgame_benchmark.py --seconds 0.5.
+
+import time
+
+from .candidates import mask_values
+from .search_state import SearchState, dct_scores
+
+# board shape (m, n) -> largest number of empty squares that is solved exactly
+ENDGAME_THRESHOLDS = {(2, 2): 12, (2, 3): 13, (3, 3): 16, (3, 4): 15, (4, 4): 16}
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SolverAborted(Exception):
+    """ Raised when the solver runs out of time or nodes """
+
+
+class EndgameSolver(object):
+    """
+    Memoized negamax over the empty squares of a position; finds the exact optimal move and final margin.
+    """
+
+    def __init__(self, max_seconds: float, max_nodes: int = 10000000):
+        self.max_seconds = max_seconds  # time limit of one solve
+        self.max_nodes = max_nodes  # node limit of one solve
+        self.nodes = 0
+        self.memo = {}  # position integer -> (value, bound)
+
+    def setup(self, state: SearchState) -> None:
+        """ Builds the compact representation of the empty squares of state """
+        geometry = state.geometry
+        candidates = state.candidates.candidates
+        self.cells = [k for k in range(geometry.size) if not state.squares[k]]
+        index = {k: i for (i, k) in enumerate(self.cells)}
+        self.masks = [candidates(k) for k in self.cells]
+        self.regions = [geometry.cell_regions[k] for k in self.cells]
+        # peers[i]: the other empty squares that share a row, column or block with empty square i
+        self.peers = [sorted({index[peer] for region in self.regions[i] for peer in geometry.region_cells[region]
+                              if peer in index and peer != k}) for (i, k) in enumerate(self.cells)]
+        self.empty_in_region = list(state.empty_in_region)
+        self.width = geometry.N.bit_length()
+        self.value_mask = (1 << self.width) - 1
+
+    def moves(self, position: int) -> list:
+        """ Returns the moves (points, i, value) of position, the scoring moves first """
+        moves = []
+        width, value_mask, empty_in_region = self.width, self.value_mask, self.empty_in_region
+        for (i, mask) in enumerate(self.masks):
+            if not mask or position >> (i * width) & value_mask:
+                continue
+            row, column, block = self.regions[i]
+            points = dct_scores[(empty_in_region[row] == 1) + (empty_in_region[column] == 1)
+                                + (empty_in_region[block] == 1)]
+            moves += [(points, i, value) for value in mask_values(mask)]
+        moves.sort(reverse=True)
+        return moves
+
+    def place(self, i: int, value: int) -> list:
+        """ Places value in empty square i; returns the peers that lost it as a candidate """
+        bit = 1 << (value - 1)
+        masks = self.masks
+        changed = [j for j in self.peers[i] if masks[j] & bit]
+        for j in changed:
+            masks[j] ^= bit
+        for region in self.regions[i]:
+            self.empty_in_region[region] -= 1
+        return changed
+
+    def take_back(self, i: int, value: int, changed: list) -> None:
+        """ Undoes place(i, value) """
+        bit = 1 << (value - 1)
+        masks = self.masks
+        for j in changed:
+            masks[j] ^= bit
+        for region in self.regions[i]:
+            self.empty_in_region[region] += 1
+
+    def negamax(self, position: int, alpha, beta):
+        """ Returns the points the player to move can still gain over the opponent """
+        self.nodes += 1
+        if self.nodes >= self.max_nodes or (self.nodes & 1023 == 0 and time.perf_counter() >= self.deadline):
+            raise SolverAborted()
+        entry = self.memo.get(position)
+        if entry is not None:
+            value, bound = entry
+            if bound == EXACT or (bound == LOWER and value >= beta) or (bound == UPPER and value <= alpha):
+                return value
+
+        moves = self.moves(position)
+        if not moves:
+            return 0
+        original_alpha = alpha
+        best = float("-inf")
+        width = self.width
+        for (points, i, value) in moves:
+            changed = self.place(i, value)
+            score = points - self.negamax(position | value << (i * width), points - beta, points - alpha)
+            self.take_back(i, value, changed)
+            if score > best:
+                best = score
+                if best >= beta:
+                    break
+                alpha = max(alpha, best)
+
+        bound = UPPER if best <= original_alpha else LOWER if best >= beta else EXACT
+        self.memo[position] = (best, bound)
+        return best
+
+    def solve(self, state: SearchState):
+        """ Returns (margin, move) with the best move (k, value) of state and the final score margin of the player
+            to move when both players play perfectly, or None if the solver ran out of time or nodes
+        """
+        self.deadline = time.perf_counter() + self.max_seconds
+        self.nodes = 0
+        self.memo = {}
+        self.setup(state)
+        player = state.ply % 2
+        margin = state.scores[player] - state.scores[1 - player]
+
+        moves = self.moves(0)
+        if not moves:
+            return None
+        best, best_move = float("-inf"), None
+        try:
+            for (points, i, value) in moves:
+                changed = self.place(i, value)
+                score = points - self.negamax(value << (i * self.width), float("-inf"), points - best)
+                self.take_back(i, value, changed)
+                if score > best:
+                    best, best_move = score, (self.cells[i], value)
+        except SolverAborted:
+            return None
+        return margin + best, best_move
@@ -0,0 +1,57 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Benchmark that determines the endgame thresholds (see endgame.py).
+#
+# For every board shape the exact solver is run on positions with an
+# increasing number of empty squares. The threshold of a shape is the largest
+# number of empty squares for which every position was solved within
+# --seconds; the script prints the thresholds as a dictionary for
+# ENDGAME_THRESHOLDS.
+#
+# Run it from the directory with simulate_game.py, with this team folder as a package:
+#   python -m team05_A1_v2.endgame_benchmark --seconds 0.5
+
+import argparse
+import time
+
+from .endgame import EndgameSolver
+from .positions import random_position
+from .search_state import SearchState
+
+SHAPES = [(2, 2), (2, 3), (3, 3), (3, 4), (4, 4)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures up to how many empty squares the endgame can be solved")
+    parser.add_argument("--seconds", type=float, default=0.5, help="time a solve may take")
+    parser.add_argument("--positions", type=int, default=5, help="positions per shape and number of empty squares")
+    parser.add_argument("--max-empty", type=int, default=40, help="largest number of empty squares tried")
+    args = parser.parse_args()
+
+    thresholds = {}
+    print(f"{'shape':>5} {'empty':>5} {'solved':>6} {'max seconds':>11} {'max nodes':>9}")
+    for (m, n) in SHAPES:
+        size = (m * n) ** 2
+        for empty in range(1, min(args.max_empty, size) + 1):
+            solved, slowest, most_nodes = 0, 0.0, 0
+            for seed in range(args.positions):
+                state = SearchState(random_position(m, n, (size - empty) / size, seed), True)
+                state.propagate()
+                solver = EndgameSolver(args.seconds)
+                start = time.perf_counter()
+                result = solver.solve(state)
+                slowest = max(slowest, time.perf_counter() - start)
+                most_nodes = max(most_nodes, solver.nodes)
+                # a position without moves counts as solved
+                solved += result is not None or not state.legal_moves()
+            print(f"{f'{m}x{n}':>5} {empty:>5} {solved:>4}/{args.positions} {slowest:>11.4f} {most_nodes:>9}")
+            if solved < args.positions:
+                break
+            thresholds[(m, n)] = empty
+    print(f"ENDGAME_THRESHOLDS = {thresholds}")
+
+
+if __name__ == "__main__":
+    main()
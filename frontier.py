@@ -0,0 +1,70 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Batched evaluation of the children of a frontier node (remaining depth 1).
+#
+# The static evaluation of a child only depends on the square of the move, not
+# on its value: the points of the move follow from the empty counts of the
+# three regions of the square, and so does the change of the region parity
+# term. With the per-region empty counts and the candidate masks of the state
+# as arrays, the evaluations of all children are a few array operations:
+#     points[k]     = dct_scores[number of regions of k with 1 empty square]
+#     quiet[k]      = no region has exactly 1 empty square after the move
+#     odd_change[k] = change of the number of regions with an odd number of
+#                     empty squares, +1 or -1 per region of k
+# A quiet child is a leaf, so its evaluation is its value. At a child that is
+# not quiet the quiescence search continues, but its evaluation is still a
+# bound: the player to move there may stand pat. So the search only has to
+# play the moves of the squares whose bound beats the best quiet child (see
+# AlphaBetaSearch.frontier_value).
+#
+# The board is read without copying from the bytearray of the candidate
+# engine; the index tables of a board shape are built once. The array setup
+# only pays off with enough children: AlphaBetaSearch uses the batch from
+# frontier_min_empty empty squares on.
+
+import numpy as np
+
+from .geometry import BoardGeometry
+from .search_state import SearchState, dct_scores
+
+# points for completing 0, 1, 2 or 3 regions
+POINTS = np.array([dct_scores[completed] for completed in range(4)])
+
+
+class FrontierEvaluator(object):
+    """
+    Static evaluations of all children of a position as arrays indexed by square.
+    """
+
+    def __init__(self, geometry: BoardGeometry):
+        self.geometry = geometry
+        self.cell_row = np.array(geometry.cell_row)
+        self.cell_col = np.array(geometry.cell_col)
+        self.cell_block = np.array(geometry.cell_block)
+        self.cell_regions = np.array(geometry.cell_regions)  # (size, 3)
+        self.full = (1 << geometry.N) - 1
+
+    def children(self, state: SearchState, ready_only: bool = False):
+        """ Returns (squares, points, quiet, odd_change) of the squares with at least one candidate; with ready_only
+            only the squares that complete a region are returned, if there are any
+        """
+        candidates = state.candidates
+        empty = np.frombuffer(candidates.squares, dtype=np.uint8) == 0
+        used = np.array(candidates.row_used)[self.cell_row] | np.array(candidates.col_used)[self.cell_col] \
+            | np.array(candidates.block_used)[self.cell_block] | np.array(candidates.taboo)
+        movable = empty & (~used & self.full != 0)
+
+        empty_in_region = np.array(state.empty_in_region)[self.cell_regions]  # (size, 3)
+        ready = (empty_in_region == 1).sum(axis=1)
+        if ready_only and state.ready_regions:
+            scoring = movable & (ready > 0)
+            if scoring.any():
+                movable = scoring
+        squares = np.flatnonzero(movable)
+        empty_in_region, ready = empty_in_region[squares], ready[squares]
+        points = POINTS[ready]
+        quiet = state.ready_regions - ready + (empty_in_region == 2).sum(axis=1) == 0
+        odd_change = 2 * (empty_in_region % 2 == 0).sum(axis=1) - 3
+        return squares, points, quiet, odd_change
@@ -0,0 +1,78 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Precomputed board geometry shared by all SudokuAI variants.
+#
+# Cells are addressed by their flat index k = i * N + j (the same order as
+# SudokuBoard.squares). Regions are numbered 0..3N-1:
+#   - 0 .. N-1     rows
+#   - N .. 2N-1    columns
+#   - 2N .. 3N-1   blocks (numbered row-wise, block k has the name f"block{k+1}")
+# The tables only depend on the block shape (m, n), so they are built once per
+# shape and cached at module level; later turns (and later games on the same
+# board size) get them for free.
+
+
+class BoardGeometry(object):
+    """
+    Flat lookup tables for a board with blocks of m rows and n columns.
+    """
+
+    def __init__(self, m: int, n: int):
+        N = m * n
+        self.m = m  # block is m squares high
+        self.n = n  # block is n squares wide
+        self.N = N  # board is N*N squares
+        self.size = N * N  # number of cells
+
+        cells = range(self.size)
+
+        # cell -> row / column / block id
+        self.cell_row = [k // N for k in cells]
+        self.cell_col = [k % N for k in cells]
+        self.cell_block = [(k // N) // m * m + (k % N) // n for k in cells]
+
+        # cell -> (i, j) coordinates
+        self.cell_coordinates = [(k // N, k % N) for k in cells]
+
+        # cell -> the three region ids (row, column, block) the cell is part of
+        self.cell_regions = [(self.cell_row[k], N + self.cell_col[k], 2 * N + self.cell_block[k]) for k in cells]
+
+        # region -> cells of that region
+        region_cells = [[] for _ in range(3 * N)]
+        for k in cells:
+            for region in self.cell_regions[k]:
+                region_cells[region].append(k)
+        self.region_cells = [tuple(group) for group in region_cells]
+
+        # region -> name, compatible with the keys of the old dct_regions dictionaries
+        self.region_names = [f"row{index}" for index in range(N)] \
+                            + [f"column{index}" for index in range(N)] \
+                            + [f"block{index + 1}" for index in range(N)]
+
+        # cell -> all other cells that share a row, column or block with it
+        self.cell_peers = [tuple(sorted((set(self.region_cells[self.cell_row[k]])
+                                         | set(self.region_cells[N + self.cell_col[k]])
+                                         | set(self.region_cells[2 * N + self.cell_block[k]])) - {k}))
+                           for k in cells]
+
+        # name -> list of (i, j) coordinates; same layout as the dct_regions that used to be built every turn
+        self.dct_regions = {self.region_names[region]: [self.cell_coordinates[k] for k in self.region_cells[region]]
+                            for region in range(3 * N)}
+
+    def index(self, i: int, j: int) -> int:
+        """ Returns the flat cell index of square (i, j) """
+        return i * self.N + j
+
+
+# module level cache: (m, n) -> BoardGeometry
+_geometries = {}
+
+
+def board_geometry(m: int, n: int) -> BoardGeometry:
+    """ Returns the (cached) geometry tables for blocks of m rows and n columns """
+    geometry = _geometries.get((m, n))
+    if geometry is None:
+        geometry = _geometries[(m, n)] = BoardGeometry(m, n)
+    return geometry
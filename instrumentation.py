@@ -0,0 +1,167 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Opt-in instrumentation of the alpha-beta search with JSONL trace output.
+#
+# SearchTrace.attach(search) wraps the methods of one AlphaBetaSearch instance
+# (minimax, start, search_root, alpha_beta's helpers getChildren, evaluate and
+# frontier_children, the cutoff hook of the move ordering and the iteration
+# hook of the clock) with counting and timing versions. The class itself is
+# never changed, so a search without a trace runs the plain methods and pays
+# nothing.
+#
+# Per iterative-deepening iteration the trace records the nodes, the time, the
+# effective branching factor (the one the time manager predicts the next depth
+# with, see TimeManager.branching_factor), the expanded nodes and children
+# searched per expanded node, the cutoffs and cutoff rate, the aspiration
+# re-searches, the time spent in getChildren and in evaluate, and the
+# transposition table counters of that iteration. A batch of frontier_children
+# counts as an expanded node whose children are all evaluated, with its time
+# as evaluate time; "batched" counts the batches. At the end of minimax one
+# JSON record with the iterations and the totals of the move is appended to
+# the trace file, with the counters of the iteration that was still running
+# when the time ran out.
+
+import json
+import time
+
+# counters kept per iteration
+COUNTERS = ("expanded", "children", "cutoffs", "root_searches", "evaluations", "children_seconds",
+            "evaluate_seconds", "batched")
+
+
+class SearchTrace(object):
+    """
+    Counters and timings of an AlphaBetaSearch, written as one JSON line per move.
+    """
+
+    def __init__(self, path: str):
+        self.path = path  # JSONL file the records are appended to
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.iterations = []
+        self.state = None
+        self.tt_stats = {}
+
+    def attach(self, search) -> None:
+        """ Wraps the methods of search with the instrumented versions """
+        counters, timer = self.counters, time.perf_counter
+        get_children, evaluate, frontier_children = search.getChildren, search.evaluate, search.frontier_children
+        search_root, start, minimax = search.search_root, search.start, search.minimax
+        cutoff, iteration_done = search.ordering.cutoff, search.clock.iteration_done
+
+        def traced_get_children(*args):
+            counters["expanded"] += 1
+            children = get_children(*args)
+            while True:
+                begin = timer()
+                try:
+                    move = next(children)
+                except StopIteration:
+                    counters["children_seconds"] += timer() - begin
+                    return
+                counters["children_seconds"] += timer() - begin
+                counters["children"] += 1
+                yield move
+
+        def traced_evaluate(state):
+            begin = timer()
+            value = evaluate(state)
+            counters["evaluations"] += 1
+            counters["evaluate_seconds"] += timer() - begin
+            return value
+
+        def traced_frontier_children(state):
+            begin = timer()
+            batch = frontier_children(state)
+            counters["evaluate_seconds"] += timer() - begin
+            children = len(batch[0])
+            counters["batched"] += 1
+            counters["expanded"] += 1
+            counters["children"] += children
+            counters["evaluations"] += children
+            return batch
+
+        def traced_cutoff(*args):
+            counters["cutoffs"] += 1
+            cutoff(*args)
+
+        def traced_search_root(*args):
+            counters["root_searches"] += 1
+            return search_root(*args)
+
+        def traced_start(state):
+            self.state = state
+            self.iterations = []
+            self.tt_stats = search.tt.stats()
+            for name in COUNTERS:
+                counters[name] = 0
+            start(state)
+
+        def traced_iteration_done(nodes):
+            iteration_done(nodes)
+            self.iteration(search)
+
+        def traced_minimax(game_state):
+            best_move = minimax(game_state)
+            self.write(self.record(search, best_move))
+            return best_move
+
+        search.getChildren = traced_get_children
+        search.evaluate = traced_evaluate
+        search.frontier_children = traced_frontier_children
+        search.ordering.cutoff = traced_cutoff
+        search.search_root = traced_search_root
+        search.start = traced_start
+        search.clock.iteration_done = traced_iteration_done
+        search.minimax = traced_minimax
+
+    def iteration(self, search) -> None:
+        """ Records the counters of the iteration that just completed and starts counting the next one """
+        nodes, seconds = search.clock.iterations[-1]
+        branching_factor = search.clock.branching_factor()
+        counters = self.counters
+        expanded = counters["expanded"]
+        tt_stats = search.tt.stats()
+        record = {"depth": search.depth, "value": search.value, "nodes": nodes, "seconds": seconds,
+                  "nodes_per_second": nodes / seconds if seconds > 0 else None,
+                  "branching_factor": branching_factor if branching_factor else None,
+                  "children_per_expanded": counters["children"] / expanded if expanded else None,
+                  "cutoff_rate": counters["cutoffs"] / expanded if expanded else None,
+                  "aspiration_researches": counters["root_searches"] - 1}
+        record.update(counters)
+        del record["root_searches"]
+        record["tt"] = {name: tt_stats[name] - self.tt_stats.get(name, 0)
+                        for name in ("probes", "hits", "collisions", "stores", "replacements")}
+        record["tt"]["hit_rate"] = record["tt"]["hits"] / record["tt"]["probes"] if record["tt"]["probes"] else 0.0
+        self.iterations.append(record)
+        self.tt_stats = tt_stats
+        for name in COUNTERS:
+            counters[name] = 0
+
+    def record(self, search, best_move) -> dict:
+        """ Returns the trace record of a finished move """
+        state = self.state
+        geometry = state.geometry
+        move = None
+        if best_move is not None:
+            move = list(geometry.cell_coordinates[best_move[0]]) + [best_move[1]]
+        record = {"time": time.time(), "m": geometry.m, "n": geometry.n, "ply": state.ply,
+                  "empty": state.empty_count(), "budget": search.max_seconds,
+                  "elapsed": search.clock.elapsed(), "timed_out": search.timed_out,
+                  "move": move, "value": search.value, "depth": search.depth, "nodes": search.nodes,
+                  "iterations": self.iterations,
+                  "unfinished_iteration": dict(self.counters),
+                  "tt": search.tt.stats(),
+                  "ordering": {"history": len(search.ordering.history),
+                               "killers": sum(len(killers) for killers in search.ordering.killers)},
+                  "pipeline": search.pipeline.stats()}
+        if state.propagator is not None:
+            record["propagation"] = {rule: {"calls": calls, "seconds": seconds, "removed": removed}
+                                     for rule, (calls, seconds, removed) in state.propagator.stats.items()}
+        return record
+
+    def write(self, record: dict) -> None:
+        """ Appends a record to the trace file """
+        with open(self.path, "a") as file:
+            file.write(json.dumps(record) + "\n")
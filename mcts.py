@@ -0,0 +1,219 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Monte Carlo Tree Search (UCT), an anytime alternative to the alpha-beta search.
+#
+# Every iteration walks down the tree with the UCT rule (average result plus
+# an exploration bonus for children that were rarely visited), expands the
+# leaf it reaches, plays the rest of the game with a fast playout and adds the
+# result (win 1, draw 0.5, loss 0 for the player who made the move into a
+# node) to every node on the path. The moves are played on the single mutable
+# SearchState and taken back after every iteration.
+#
+# The tree is stored in flat arrays indexed by node number; the children of a
+# node are created together when it is expanded, so they are the consecutive
+# nodes first_child[node] .. first_child[node] + child_count[node] - 1. No
+# node objects are allocated, which keeps large trees small and fast.
+#
+# Playouts (see PLAYOUTS):
+#   - random: fills random empty squares with random candidate values,
+#   - greedy: plays the square that completes the most regions whenever there
+#     is one, otherwise a random move.
+# A square without candidates stays empty for the rest of the playout, like a
+# square that only has taboo moves left in a real game.
+#
+# The most visited root move is proposed every propose_interval seconds and
+# at the end, so a move is available whenever the process is stopped.
+#
+# The candidates without a solution are removed once, at the root; they have
+# no solution in the positions below it either. The iterations then run
+# without propagation, which would cost more than a whole playout per move.
+# At every proposal the playouts so far are reported to the TimeManager as a
+# completed iteration, with the playouts as its nodes, so the benchmarks show
+# the playouts per second even when the process is stopped.
+
+import math
+import random
+import time
+from array import array
+
+from .candidates import mask_values
+from .search_state import SearchState
+from .time_manager import TimeManager
+
+PLAYOUTS = ("random", "greedy")
+
+
+class MonteCarloTreeSearch(object):
+    """
+    UCT search with playouts on a SearchState and the tree in flat arrays.
+    """
+
+    def __init__(self, propose_move, max_seconds: float, playout: str = "greedy", exploration: float = 0.7,
+                 propose_interval: float = 0.1, max_nodes: int = 2000000, seed=None):
+        if playout not in PLAYOUTS:
+            raise ValueError(f"unknown playout {playout}; expected one of {PLAYOUTS}")
+        self.propose_move = propose_move  # callback receiving (i, j, value) of the best move so far
+        self.max_seconds = max_seconds  # time budget per move
+        self.clock = TimeManager(max_seconds, check_interval=1)
+        self.playout = playout
+        self.exploration = exploration  # weight of the exploration term of the UCT rule
+        self.propose_interval = propose_interval  # seconds between two proposals of the most visited root move
+        self.max_nodes = max_nodes  # the tree is not expanded beyond this number of nodes
+        self.random = random.Random(seed)
+        self.iterations = 0  # playouts of the last search
+        self.clear()
+
+    def clear(self) -> None:
+        """ Removes all nodes of the tree """
+        self.parent = array("i")
+        self.move = array("i")  # move into the node, k * (N + 1) + value; -1 for the root
+        self.first_child = array("i")  # -1 while the node is not expanded
+        self.child_count = array("i")
+        self.visits = array("i")
+        self.wins = array("d")  # sum of the results for the player who made the move into the node
+
+    def add_node(self, parent: int, move: int) -> None:
+        self.parent.append(parent)
+        self.move.append(move)
+        self.first_child.append(-1)
+        self.child_count.append(0)
+        self.visits.append(0)
+        self.wins.append(0.0)
+
+    def expand(self, state: SearchState, node: int) -> None:
+        """ Creates the children of node, one for every legal move of state """
+        moves = state.legal_moves()
+        self.first_child[node] = len(self.move)
+        self.child_count[node] = len(moves)
+        width = state.geometry.N + 1
+        for (k, value) in moves:
+            self.add_node(node, k * width + value)
+
+    def select(self, node: int) -> int:
+        """ Returns the child of node with the highest UCT value; unvisited children are tried first """
+        visits, wins = self.visits, self.wins
+        first = self.first_child[node]
+        log_visits = math.log(visits[node])
+        exploration = self.exploration
+        best, best_value = first, float("-inf")
+        for child in range(first, first + self.child_count[node]):
+            child_visits = visits[child]
+            if child_visits == 0:
+                return child
+            value = wins[child] / child_visits + exploration * math.sqrt(log_visits / child_visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def play_out(self, state: SearchState) -> int:
+        """ Plays the game to the end from state and takes the moves back;
+            returns the final score difference (first player minus second player)
+        """
+        squares, candidates = state.squares, state.candidates.candidates
+        randrange = self.random.randrange
+        greedy = self.playout == "greedy"
+        cells = [k for k in range(state.geometry.size) if not squares[k]]
+        played = 0
+        while cells:
+            k = -1
+            if greedy:
+                # the ready square that completes the most regions, if it has a candidate
+                best_points = 0
+                for square in state.ready_squares():
+                    points = state.points(square)
+                    if points > best_points and candidates(square):
+                        k, best_points = square, points
+            if k < 0:
+                index = randrange(len(cells))
+                k = cells[index]
+                cells[index] = cells[-1]
+                cells.pop()
+                if squares[k]:
+                    continue
+            mask = candidates(k)
+            if not mask:
+                continue
+            values = mask_values(mask)
+            state.apply((k, values[randrange(len(values))]))
+            played += 1
+        difference = state.scores[0] - state.scores[1]
+        for _ in range(played):
+            state.undo()
+        return difference
+
+    def iterate(self, state: SearchState) -> None:
+        """ One iteration: selection, expansion, playout and backpropagation """
+        node, played = 0, 0
+        width = state.geometry.N + 1
+        # selection
+        while self.child_count[node] > 0:
+            node = self.select(node)
+            state.apply(divmod(self.move[node], width))
+            played += 1
+        # expansion of a leaf that was visited before (the root is always expanded)
+        if self.first_child[node] < 0 and (node == 0 or self.visits[node] > 0) and len(self.move) < self.max_nodes:
+            self.expand(state, node)
+            if self.child_count[node] > 0:
+                node = self.first_child[node]
+                state.apply(divmod(self.move[node], width))
+                played += 1
+        # playout
+        difference = self.play_out(state)
+        # backpropagation: the move into a node at odd distance from the root was made by the player to move at
+        # the root
+        root_result = 1.0 if difference > 0 else 0.0 if difference < 0 else 0.5
+        if (state.ply - played) % 2 == 1:
+            root_result = 1.0 - root_result
+        result = root_result if played % 2 == 1 else 1.0 - root_result
+        while node >= 0:
+            self.visits[node] += 1
+            self.wins[node] += result
+            result = 1.0 - result
+            node = self.parent[node]
+        for _ in range(played):
+            state.undo()
+
+    def best_child(self) -> int:
+        """ Returns the most visited child of the root, or -1 if the root has no children """
+        first, count = self.first_child[0], self.child_count[0]
+        if count <= 0:
+            return -1
+        visits = self.visits
+        return max(range(first, first + count), key=visits.__getitem__)
+
+    def search(self, game_state):
+        """ Runs iterations until the time is up, proposing the most visited root move at regular
+            intervals; returns the best move as (k, value), or None if there are no moves
+        """
+        # propagation removes the root candidates without a solution, so they are never searched
+        root = SearchState(game_state, True)
+        root.propagate()
+        state = SearchState.from_snapshot(root.snapshot())
+        self.clock.start()
+        self.clock.start_iteration(0)
+        self.clear()
+        self.add_node(-1, -1)
+        self.iterations = 0
+        width = state.geometry.N + 1
+
+        proposed, next_proposal = -1, time.perf_counter() + self.propose_interval
+        while True:
+            self.iterate(state)
+            self.iterations += 1
+            if self.child_count[0] == 0:
+                return None
+            out_of_time = self.clock.out_of_time()
+            if out_of_time or time.perf_counter() >= next_proposal:
+                child = self.best_child()
+                if child != proposed:
+                    proposed = child
+                    k, value = divmod(self.move[child], width)
+                    i, j = state.geometry.cell_coordinates[k]
+                    self.propose_move(i, j, value)
+                self.clock.iteration_done(self.iterations)
+                next_proposal = time.perf_counter() + self.propose_interval
+            if out_of_time:
+                break
+        return divmod(self.move[proposed], width)
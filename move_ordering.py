@@ -0,0 +1,118 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Move ordering for the alpha-beta search.
+#
+# The children of a node are visited in this order:
+#   1. the best move from the transposition table / previous iteration,
+#   2. scoring moves, by their dct_scores value (7, 3, 1),
+#   3. the killer moves of the ply (quiet moves that caused a cutoff in a sibling),
+#   4. the remaining moves, ranked by the history table.
+# Good moves first means the cutoffs come early and most siblings are skipped.
+#
+# order() sorts a complete list of moves. staged() yields the moves stage by
+# stage, so the quiet moves are never sorted when a scoring or killer move
+# already causes a cutoff. Without a list it stands for all legal moves: the
+# scoring moves come from the ready squares, the killers are checked with
+# is_legal, and the legal moves are only generated for the last stage.
+
+from .search_state import SearchState
+
+
+class MoveOrdering(object):
+    """
+    Killer moves per ply and a history table of quiet moves that caused cutoffs.
+    """
+
+    def __init__(self, killers_per_ply: int = 2):
+        self.killers_per_ply = killers_per_ply
+        self.killers = []  # ply -> list of the most recent killer moves
+        self.history = {}  # (k, value) -> accumulated depth * depth of its cutoffs
+
+    def order(self, state: SearchState, moves, best_move=None, ply: int = 0) -> list:
+        """ Returns moves sorted from most to least promising """
+        empty_in_region, cell_regions = state.empty_in_region, state.geometry.cell_regions
+        history = self.history
+
+        # sort key: regions completed by the move (the points of dct_scores grow with it), then history;
+        # killer moves and the best move are lifted above that afterwards
+        keys = {}
+        for move in moves:
+            row, column, block = cell_regions[move[0]]
+            completed = (empty_in_region[row] == 1) + (empty_in_region[column] == 1) + (empty_in_region[block] == 1)
+            keys[move] = (completed << 42) | history.get(move, 0)
+        if ply < len(self.killers):
+            for killer in self.killers[ply]:
+                if keys.get(killer, 1 << 42) < (1 << 42):  # only quiet moves are killers
+                    keys[killer] |= 1 << 41
+        if best_move in keys:
+            keys[best_move] = 1 << 45
+        return sorted(moves, key=keys.__getitem__, reverse=True)
+
+    def staged(self, state: SearchState, moves=None, skip=None, ply: int = 0):
+        """ Generates moves (without skip) in search order: scoring moves by their points, the killer moves,
+            then the others by the history table; the quiet moves are only sorted when they are needed, and
+            if moves is None (all legal moves of state) only generated then
+        """
+        ready = state.ready_squares()
+        if moves is None:
+            scoring = state.scoring_moves() if ready else []
+        else:
+            scoring = [move for move in moves if move[0] in ready] if ready else []
+        if scoring:
+            for move in self.order(state, scoring):
+                if move != skip:
+                    yield move
+            if moves is not None and len(scoring) == len(moves):
+                return
+        searched = [skip]
+        for move in self.killer_moves(ply):
+            if move not in searched and move[0] not in ready and \
+                    (state.is_legal(move) if moves is None else move in moves):
+                yield move
+                searched.append(move)
+        if moves is None:
+            moves = state.legal_moves()
+        for move in self.by_history(moves):
+            if move[0] not in ready and move not in searched:
+                yield move
+
+    def killer_moves(self, ply: int) -> list:
+        """ Returns the killer moves of the given ply, most recent first """
+        if ply < len(self.killers):
+            return list(self.killers[ply])
+        return []
+
+    def by_history(self, moves) -> list:
+        """ Returns quiet moves sorted by the history table """
+        history = self.history
+        if not history:
+            return moves
+        return sorted(moves, key=lambda move: history.get(move, 0), reverse=True)
+
+    def snapshot(self) -> tuple:
+        """ Returns (killers, history) as picklable lists """
+        return [list(killers) for killers in self.killers], list(self.history.items())
+
+    def restore(self, snapshot, plies: int) -> None:
+        """ Restores a snapshot() taken plies moves ago: the killers move up by plies and the history is halved,
+            since the cutoffs it counts were found in older positions
+        """
+        killers, history = snapshot
+        self.killers = [list(moves) for moves in killers[plies:]]
+        self.history = {tuple(move): count >> 1 for (move, count) in history if count > 1}
+
+    def cutoff(self, state: SearchState, move, ply: int, depth: int) -> None:
+        """ Records that move caused a cutoff at the given ply and remaining depth;
+            state is the position before move was played
+        """
+        if state.points(move[0]):
+            return  # scoring moves are already ordered first
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.killers_per_ply:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
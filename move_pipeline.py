@@ -0,0 +1,189 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Configurable pipeline of pruning stages for the child generation.
+#
+# The engine variants of this team used to differ only in how they pruned the
+# moves of a position: fill the regions that can be completed first
+# (sudokuai_flll_region.py), remove candidates with x-wing patterns
+# (sudokuai_x-wing.py), or no pruning at all (sudokuai_Roelle). They are now
+# configurations of one pipeline, run by AlphaBetaSearch.getChildren on the
+# shared SearchState:
+#   1. prepare: stages that work on the candidates before any move is generated
+#      (PropagationStage removes the candidates without a solution),
+#   2. generate: the first stage that restricts the moves to a part of the board
+#      generates them (FillRegionStage: only the squares that complete a
+#      region), otherwise all legal moves are generated,
+#   3. filter: stages that remove moves from the generated list,
+#   4. the move ordering puts the remaining moves in search order.
+# If no stage restricts or filters the moves, the list of all legal moves is
+# left to the move ordering, which only builds it when the search gets past
+# the scoring and killer moves (most cutoffs happen before that).
+# Every stage counts its calls, the time it ran and what it removed, so
+# stats() shows which pruning pays for itself on a board size. A stage can be
+# limited to a phase of the game (fraction of the board filled in); the stages
+# that are active are chosen once per search in start().
+
+import time
+
+from .propagation import RULES
+from .search_state import SearchState
+
+
+class Stage(object):
+    """
+    Pruning stage of a MovePipeline, active when the filled fraction of the board is in [min_fill, max_fill].
+    """
+    name = "stage"
+
+    def __init__(self, min_fill: float = 0.0, max_fill: float = 1.0):
+        self.min_fill = min_fill
+        self.max_fill = max_fill
+        self.calls = 0
+        self.seconds = 0.0
+        self.removed = 0  # candidates, squares or moves removed by the stage
+
+    def active(self, state: SearchState) -> bool:
+        """ Returns whether the stage is used in the phase of state """
+        filled = 1.0 - state.empty_count() / state.geometry.size
+        return self.min_fill <= filled <= self.max_fill
+
+    def prepare(self, state: SearchState, depth) -> bool:
+        """ Runs before the moves of state are generated (depth is None at the root);
+            returns False if state has no solution
+        """
+        return True
+
+    def generate(self, state: SearchState):
+        """ Returns the moves of state if the stage restricts them, otherwise None """
+        return None
+
+    def filter(self, state: SearchState, moves: list) -> list:
+        """ Returns the moves that are kept """
+        return moves
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "seconds": self.seconds, "removed": self.removed}
+
+
+class PropagationStage(Stage):
+    """
+    Removes the candidates without a solution with the rules of the Propagator of the state.
+    """
+    name = "propagation"
+
+    def __init__(self, rules=RULES, min_depth: int = 3, tree_fish: bool = False,
+                 min_fill: float = 0.0, max_fill: float = 1.0):
+        super().__init__(min_fill, max_fill)
+        self.rules = tuple(rules)
+        self.min_depth = min_depth  # smallest remaining depth at which the tree nodes propagate
+        self.tree_fish = tree_fish  # also apply the (whole board) fish rules in the tree, not only at the root
+
+    def prepare(self, state: SearchState, depth) -> bool:
+        # all rules are used at the root; in the tree only the cheap region rules (unless tree_fish is set),
+        # and not close to the leaves
+        if depth is not None and depth < self.min_depth:
+            return True
+        propagator = state.propagator
+        if propagator is None:
+            return True
+        start = time.perf_counter()
+        removed = sum(counters[2] for counters in propagator.stats.values())
+        consistent = propagator.propagate(fish=depth is None or self.tree_fish)
+        self.removed += sum(counters[2] for counters in propagator.stats.values()) - removed
+        self.calls += 1
+        self.seconds += time.perf_counter() - start
+        return consistent
+
+
+class FillRegionStage(Stage):
+    """
+    If there is only 1 empty square in 1 or more regions, only generates the moves that fill these squares.
+    """
+    name = "fill_region"
+
+    def generate(self, state: SearchState):
+        # the moves of the other squares are never generated; removed counts the empty squares that are skipped
+        start = time.perf_counter()
+        moves = state.scoring_moves() or None
+        if moves is not None:
+            self.removed += state.empty_count() - len({k for (k, value) in moves})
+        self.calls += 1
+        self.seconds += time.perf_counter() - start
+        return moves
+
+
+class MovePipeline(object):
+    """
+    Stages that prune the children of a position, in the order they are run.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.select(self.stages)
+
+    def propagation(self) -> tuple:
+        """ Returns the propagation rules the search state needs for this pipeline """
+        rules = []
+        for stage in self.stages:
+            if isinstance(stage, PropagationStage):
+                rules += [rule for rule in stage.rules if rule not in rules]
+        return tuple(rules)
+
+    def start(self, state: SearchState) -> None:
+        """ Chooses the stages that are active in the phase of the root state """
+        self.select([stage for stage in self.stages if stage.active(state)])
+
+    def select(self, stages) -> None:
+        """ Makes stages the active stages; only the stages that override a step are run in it """
+        self.active = stages
+        self.preparing = [stage for stage in stages if type(stage).prepare is not Stage.prepare]
+        self.generating = [stage for stage in stages if type(stage).generate is not Stage.generate]
+        self.filtering = [stage for stage in stages if type(stage).filter is not Stage.filter]
+
+    def scoring_only(self) -> bool:
+        """ Returns whether the active stages only generate the moves that complete a region, when there are any """
+        return any(isinstance(stage, FillRegionStage) for stage in self.active)
+
+    def prepare(self, state: SearchState, depth) -> bool:
+        """ Runs the prepare stages; returns False if state has no solution """
+        for stage in self.preparing:
+            if not stage.prepare(state, depth):
+                return False
+        return True
+
+    def moves(self, state: SearchState):
+        """ Generates the moves of state and runs the filter stages on them; returns None if all legal moves
+            of state are kept, which are then generated lazily by the move ordering
+        """
+        moves = None
+        for stage in self.generating:
+            moves = stage.generate(state)
+            if moves is not None:
+                break
+        if moves is None:
+            if not self.filtering:
+                return None
+            moves = state.legal_moves()
+        for stage in self.filtering:
+            moves = stage.filter(state, moves)
+        return moves
+
+    def stats(self) -> dict:
+        """ Returns the counters of every stage and whether it is active in the current search """
+        return {stage.name: dict(stage.stats(), active=stage in self.active) for stage in self.stages}
+
+
+# the pruning of the former engine variants, by name
+CONFIGURATIONS = {
+    "default": lambda: [PropagationStage(), FillRegionStage()],
+    "fill_region": lambda: [FillRegionStage()],
+    "x_wing": lambda: [FillRegionStage(), PropagationStage(rules=("x_wing",), tree_fish=True)],
+    "unfiltered": lambda: [],
+}
+
+
+def move_pipeline(configuration: str = "default") -> MovePipeline:
+    """ Returns a new pipeline of one of the CONFIGURATIONS """
+    return MovePipeline(CONFIGURATIONS[configuration]())
@@ -0,0 +1,89 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# NumPy legal-move tensor for whole-board move generation.
+#
+# The board is an (N, N) int array. Its one-hot encoding (N, N, N) has
+# [i, j, value - 1] set when square (i, j) holds value. Reducing it with any()
+# over the columns, the rows and the squares of every block (after reshaping
+# the board into blocks) gives the values used per row, column and block, so
+# the legality tensor
+#     legal[i, j, value - 1] = square (i, j) is empty
+#                              and value is not used in row i, column j or the block of (i, j)
+#                              and (i, j, value) is not a taboo move
+# takes a handful of vectorized operations. legality_tensor also accepts a stack
+# of boards of shape (..., N, N), so the moves of many positions (self-play,
+# analysis of a game record) are generated in one call.
+
+import numpy as np
+
+from .geometry import BoardGeometry
+
+
+def taboo_tensor(taboo_moves, N: int) -> np.ndarray:
+    """ Returns the (N, N, N) boolean tensor with [i, j, value - 1] set for every taboo move """
+    taboo = np.zeros((N, N, N), dtype=bool)
+    for move in taboo_moves:
+        taboo[move.i, move.j, move.value - 1] = True
+    return taboo
+
+
+def legality_tensor(boards, m: int, n: int, taboo=None) -> np.ndarray:
+    """ Returns the (..., N, N, N) boolean legality tensor of boards of shape (..., N, N) with blocks of
+        m rows and n columns; taboo is None or a boolean tensor that broadcasts to the result
+    """
+    boards = np.asarray(boards)
+    N = m * n
+    stack = boards.shape[:-2]
+    one_hot = boards[..., None] == np.arange(1, N + 1)  # (..., N, N, N)
+
+    row_used = one_hot.any(axis=-2)  # (..., row, value)
+    col_used = one_hot.any(axis=-3)  # (..., column, value)
+    # split the rows in n bands of m rows and the columns in m stacks of n columns
+    blocks = one_hot.reshape(stack + (n, m, m, n, N))
+    block_used = blocks.any(axis=(-4, -2))  # (..., band, stack, value)
+    block_used = np.repeat(np.repeat(block_used, m, axis=-3), n, axis=-2)  # (..., row, column, value)
+
+    used = row_used[..., :, None, :] | col_used[..., None, :, :] | block_used
+    legal = ~used & (boards == 0)[..., None]
+    if taboo is not None:
+        legal &= ~taboo
+    return legal
+
+
+class MoveTensor(object):
+    """
+    Board as an (N, N) array with its legality tensor; the tensor is computed once, on first use.
+    """
+
+    def __init__(self, geometry: BoardGeometry, squares, taboo_moves=()):
+        self.geometry = geometry
+        N = geometry.N
+        self.board = np.array(squares, dtype=np.int8 if N < 128 else np.int16).reshape(N, N)
+        self.taboo = taboo_tensor(taboo_moves, N) if taboo_moves else None
+        self._legal = None
+
+    @property
+    def legal(self) -> np.ndarray:
+        """ Returns the (N, N, N) legality tensor: [i, j, value - 1] is set when Move(i, j, value) is legal """
+        if self._legal is None:
+            self._legal = legality_tensor(self.board, self.geometry.m, self.geometry.n, self.taboo)
+        return self._legal
+
+    def moves(self) -> list:
+        """ Returns all legal moves as (i, j, value) triples, ordered by square and value """
+        return [(i, j, v + 1) for (i, j, v) in np.argwhere(self.legal).tolist()]
+
+    def candidate_counts(self) -> np.ndarray:
+        """ Returns the (N, N) array with the number of legal values of every square """
+        return self.legal.sum(axis=-1)
+
+    def least_candidates_square(self):
+        """ Returns the first square (in row order) with the fewest legal values, or None if there is no legal move """
+        counts = self.candidate_counts()
+        if not counts.any():
+            return None
+        counts = np.where(counts > 0, counts, self.geometry.N + 1)
+        i, j = divmod(int(np.argmin(counts)), self.geometry.N)
+        return i, j
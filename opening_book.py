@@ -0,0 +1,105 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Opening book: best moves of common starting positions, searched offline.
+#
+# The book is a binary file with a small header followed by fixed size
+# entries sorted by key:
+#     header: magic (8 bytes), version (uint32), number of entries (uint32)
+#     entry:  key (uint64), cell (uint16), value (uint8), depth (uint8), score (int16)
+# The key is the Zobrist hash of the canonical form of the board under the
+# board symmetries, with the side to move (see symmetry.py; zobrist.py draws
+# the keys from a generator seeded with the board shape, so they are the same
+# in every process), and the cell of the move is in the canonical frame, so
+# one entry answers all symmetric positions. The score is the value of the position relative to
+# the current scores, i.e. the points the player to move can still gain over
+# the opponent.
+#
+# The file is opened with mmap and searched with a binary search, so a lookup
+# reads about log2(entries) entries of 14 bytes and opening the book costs no
+# memory beyond the pages that are touched. Build it with build_book.py.
+
+import mmap
+import os
+import struct
+
+# default location of the book, next to this module
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+MAGIC = b"SUDOKUBK"
+VERSION = 2  # 2: canonical keys
+HEADER = struct.Struct("<8sII")
+ENTRY = struct.Struct("<QHBBh")
+
+
+def write_book(path: str, entries: dict) -> None:
+    """ Writes entries (key -> (cell, value, depth, score)) as a book file; replaces the file atomically """
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+        for key in sorted(entries):
+            cell, value, depth, score = entries[key]
+            file.write(ENTRY.pack(key, cell, value, min(depth, 255), max(-32768, min(32767, score))))
+    os.replace(temporary, path)
+
+
+class OpeningBook(object):
+    """
+    Read-only, memory-mapped book file with binary search lookups.
+    """
+
+    def __init__(self, path: str = BOOK_FILE):
+        self.path = path
+        self.count = 0
+        self.data = None
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is not an opening book")
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION or len(self.data) != HEADER.size + count * ENTRY.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening book of version {VERSION}")
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, key: int):
+        """ Returns (cell, value, depth, score) of the position with the given hash, or None if it is not in the book """
+        data, unpack_from, size = self.data, ENTRY.unpack_from, ENTRY.size
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry = unpack_from(data, HEADER.size + middle * size)
+            if entry[0] < key:
+                low = middle + 1
+            elif entry[0] > key:
+                high = middle
+            else:
+                return entry[1:]
+        return None
+
+    def entries(self) -> dict:
+        """ Returns all entries as key -> (cell, value, depth, score) """
+        return {entry[0]: entry[1:] for entry in ENTRY.iter_unpack(self.data[HEADER.size:])}
+
+    def close(self) -> None:
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+
+# module level cache: path -> OpeningBook (None if there is no usable book at that path)
+_books = {}
+
+
+def opening_book(path: str = BOOK_FILE):
+    """ Returns the (cached) book at path, or None if there is no book file """
+    if path not in _books:
+        try:
+            _books[path] = OpeningBook(path)
+        except (OSError, ValueError):
+            _books[path] = None
+    return _books[path]
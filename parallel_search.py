@@ -0,0 +1,195 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Parallel root search for multi-core machines.
+#
+# The moves of the root are dealt out round-robin over a pool of worker
+# processes. Every worker runs its own iterative deepening alpha-beta search
+# over its share of the root moves and reports the best (value, move) of every
+# depth it completes. The workers share the best root value found so far per
+# depth in a shared array: a worker searches its next root move with alpha
+# raised to that value, so moves that cannot beat another worker's best move
+# are refuted with a cheap null window probe.
+#
+# The parent combines the reports as they come in. Whenever a worker completes
+# a depth, the best move of that depth so far is proposed, provided the worker
+# of the proposed move has completed that depth too, so the proposed move is
+# only replaced after it was searched as deeply. Another worker's move only
+# replaces it with an exact value; an upper bound does not show that it is
+# better, until all workers have completed the depth.
+#
+# A daemonic process (the framework and benchmark.py run every move in one)
+# cannot start a pool. There the search runs serially in the process itself;
+# it warns about it and sets serial, so a run with several workers is not
+# mistaken for a parallel one.
+#
+# The framework stops the process of a move by terminating it, which does not
+# stop the pool. Every worker watches its parent and exits as soon as the
+# parent is gone.
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from .move_pipeline import move_pipeline
+from .search import AlphaBetaSearch
+from .search_state import SearchState
+
+# value in the shared array for "no root value known yet at this depth"
+NO_VALUE = -(1 << 30)
+
+# shared best value per depth and the queue for the reports, set in every worker process by _init_worker
+_shared_best = None
+_reports = None
+
+
+# seconds between two checks of a worker whether its parent is still running
+PARENT_CHECK_INTERVAL = 0.05
+
+
+def _watch_parent(parent: int) -> None:
+    """ Exits the worker process once its parent has stopped (the worker is then adopted by another process) """
+    while os.getppid() == parent:
+        time.sleep(PARENT_CHECK_INTERVAL)
+    os._exit(0)
+
+
+def _init_worker(shared_best, reports):
+    global _shared_best, _reports
+    _shared_best, _reports = shared_best, reports
+    threading.Thread(target=_watch_parent, args=(os.getppid(),), daemon=True).start()
+
+
+def _search_worker(worker, snapshot, moves, max_seconds, pipeline):
+    """ Iterative deepening search of a share of the root moves, run in a worker process """
+    search = AlphaBetaSearch(None, max_seconds, pipeline=move_pipeline(pipeline))
+    state = SearchState.from_snapshot(snapshot, search.propagation)
+    search.start(state)
+    shared_best = _shared_best
+
+    best_move = None
+    for depth in range(1, min(state.empty_count(), len(shared_best) - 1) + 1):
+        if not search.clock.start_iteration(search.nodes) and best_move is not None:
+            break
+        value, depth_best_move, exact = float("-inf"), None, False
+        for move in search.ordering.order(state, moves, best_move):
+            # moves must beat the best root value of all workers at this depth
+            alpha = value
+            if shared_best[depth] != NO_VALUE:
+                alpha = max(alpha, shared_best[depth])
+            state.apply(move)
+            if alpha == float("-inf"):
+                score = search.alpha_beta(state, depth - 1, alpha, float("inf"))
+            else:
+                score = search.alpha_beta(state, depth - 1, alpha, alpha + 1)
+                if score > alpha:
+                    score = search.alpha_beta(state, depth - 1, alpha, float("inf"))
+            state.undo()
+            if search.timed_out:
+                break
+            if score > value or depth_best_move is None:
+                # a score that did not beat alpha is only an upper bound
+                value, depth_best_move, exact = score, move, score > alpha
+            if score > alpha:
+                # an exact value: publish it to the other workers
+                with shared_best.get_lock():
+                    if shared_best[depth] == NO_VALUE or score > shared_best[depth]:
+                        shared_best[depth] = score
+        if search.timed_out or depth_best_move is None:
+            break
+        best_move = depth_best_move
+        search.clock.iteration_done(search.nodes)
+        _reports.put((worker, depth, (value, exact), best_move, search.nodes))
+    _reports.put((worker, None, None, None, search.nodes))
+
+
+class ParallelRootSearch(object):
+    """
+    Root-splitting search over a process pool; proposes the best move whenever a worker completes a depth.
+    """
+
+    def __init__(self, propose_move, max_seconds: float, workers: int, pipeline: str = "default"):
+        self.propose_move = propose_move  # callback receiving (i, j, value) of the best move so far
+        self.max_seconds = max_seconds  # time budget per move
+        self.workers = workers
+        self.pipeline = pipeline  # name of the move pipeline configuration the workers search with
+        self.nodes = 0  # nodes searched by all workers together
+        self.depth = 0  # deepest depth completed by all workers
+        self.serial = False  # whether the last search ran serially, because no pool could be started
+
+    def minimax(self, game_state):
+        """ Searches the position on all workers and returns the best move found """
+        start_time = time.perf_counter()
+        ordering_search = AlphaBetaSearch(None, self.max_seconds, pipeline=move_pipeline(self.pipeline))
+        state = SearchState(game_state, ordering_search.propagation)
+        moves = list(ordering_search.getChildren(state))
+        if not moves:
+            return None
+        workers = max(1, min(self.workers, len(moves)))
+        max_depth = state.empty_count()
+        self.serial = multiprocessing.current_process().daemon
+        if self.serial:
+            # daemonic processes cannot start workers: search serially instead
+            warnings.warn(f"parallel search with {self.workers} workers runs serially in a daemonic process",
+                          RuntimeWarning)
+            search = AlphaBetaSearch(self.propose_move, self.max_seconds, pipeline=move_pipeline(self.pipeline))
+            best_move = search.minimax(game_state)
+            self.nodes, self.depth = search.nodes, len(search.clock.iterations)
+            return best_move
+
+        context = multiprocessing.get_context()
+        shared_best = context.Array("i", [NO_VALUE] * (max_depth + 2))
+        reports = context.Queue()
+        # the workers stop a little earlier, so their last reports reach the parent in time
+        worker_seconds = max(0.0, self.max_seconds - (time.perf_counter() - start_time)) * 0.95
+
+        self.nodes, self.depth = 0, 0
+        best_move, best_worker, best_depth = None, None, 0  # the proposed move, its worker and its depth
+        reported = {}  # depth -> {worker: ((value, exact), move)}
+        nodes = [0] * workers
+        running = workers
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(shared_best, reports))
+        try:
+            for worker in range(workers):
+                pool.submit(_search_worker, worker, state.snapshot(), moves[worker::workers], worker_seconds,
+                            self.pipeline)
+            while running:
+                remaining = self.max_seconds - (time.perf_counter() - start_time)
+                if remaining <= 0:
+                    break
+                try:
+                    worker, depth, value, move, worker_nodes = reports.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                nodes[worker] = worker_nodes
+                if depth is None:
+                    running -= 1
+                    continue
+                results = reported.setdefault(depth, {})
+                results[worker] = (value, move)
+                # a depth is complete when every worker reported it
+                while len(reported.get(self.depth + 1, ())) == workers:
+                    self.depth += 1
+                if depth < best_depth or (best_worker is not None and best_worker not in results):
+                    continue
+                # exact values win over upper bounds of the same value
+                complete = len(results) == workers
+                candidates = [(value, move, worker) for (worker, (value, move)) in results.items()
+                              if complete or best_worker in (None, worker) or value[1]]
+                value, move, best_worker = max(candidates, key=lambda result: result[0])
+                best_depth = depth
+                if move != best_move:
+                    best_move = move
+                    i, j = state.geometry.cell_coordinates[best_move[0]]
+                    self.propose_move(i, j, best_move[1])
+        finally:
+            # the workers stop by themselves at their deadline; waiting for them lets the process exit cleanly
+            pool.shutdown(wait=True, cancel_futures=True)
+        self.nodes = sum(nodes)
+        return best_move
@@ -0,0 +1,41 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Reproducible test positions for the benchmarks.
+#
+# A position is a random subset of a random valid solution, so it can always be
+# completed (no move of the position is forced to be taboo). The same seed
+# always gives the same position.
+
+import random
+from competitive_sudoku.sudoku import GameState, SudokuBoard
+
+
+def random_solution(m: int, n: int, generator: random.Random) -> list:
+    """ Returns the squares of a random solved board with blocks of m rows and n columns """
+    N = m * n
+    # a valid pattern, shuffled with symmetries that keep it valid
+    values = list(range(1, N + 1))
+    generator.shuffle(values)
+    bands = list(range(n))  # groups of m rows
+    stacks = list(range(m))  # groups of n columns
+    generator.shuffle(bands)
+    generator.shuffle(stacks)
+    rows = [band * m + r for band in bands for r in generator.sample(range(m), m)]
+    columns = [stack * n + c for stack in stacks for c in generator.sample(range(n), n)]
+    return [values[((r % m) * n + r // m + c) % N] for r in rows for c in columns]
+
+
+def random_position(m: int, n: int, fill: float, seed: int) -> GameState:
+    """ Returns a game state where a fraction fill of the squares is filled in, with equal scores """
+    generator = random.Random(f"{m}x{n}-{fill}-{seed}")
+    N = m * n
+    solution = random_solution(m, n, generator)
+    board = SudokuBoard(m, n)
+    cells = list(range(N * N))
+    generator.shuffle(cells)
+    filled = int(round(fill * N * N))
+    for k in cells[:filled]:
+        board.squares[k] = solution[k]
+    return GameState(SudokuBoard(m, n), board, [], [], [0, 0])
@@ -0,0 +1,216 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Incremental constraint propagation on top of the candidate engine.
+#
+# A value that no solution of the sudoku can have in a square is a move the
+# game declares taboo: the player loses the turn without filling anything in.
+# The propagator finds such values with the classic solving rules
+#   - naked single:  a square with one candidate removes it from its peers,
+#   - hidden single: a value with one possible square in a region removes the
+#                    other candidates of that square,
+#   - naked pair:    two squares of a region with the same two candidates remove
+#                    them from the rest of the region,
+#   - x-wing / swordfish: a value whose squares in 2 (3) rows lie in the same
+#                    2 (3) columns is removed from those columns in the other
+#                    rows, and the same with rows and columns swapped,
+# and writes them into the taboo masks of the CandidateEngine, so the legal
+# move generation skips them without any extra work.
+#
+# Every eliminated value is recorded on a trail. push() is called when a move
+# is applied and pop() when it is undone, which restores exactly the masks that
+# were changed below it. propagate() only looks at the regions that changed
+# since the last call (the regions of the moves applied since then and of the
+# squares that lost candidates); the fish rules look at the whole board, but
+# only when something changed. Deductions stay valid deeper in the tree: a
+# filled square only removes solutions.
+
+import time
+from itertools import combinations
+
+from .candidates import CandidateEngine
+
+# rules in the order they are tried
+RULES = ("naked_single", "hidden_single", "naked_pair", "x_wing", "swordfish")
+
+
+class Propagator(object):
+    """
+    Solving rules that remove candidates without a solution, with a trail to undo them per move.
+    """
+
+    def __init__(self, candidates: CandidateEngine, rules=RULES):
+        geometry = candidates.geometry
+        self.candidates = candidates
+        self.geometry = geometry
+        self.rules = tuple(rule for rule in RULES if rule in rules)
+        self.region_rules = [getattr(self, rule) for rule in self.rules
+                             if rule in ("naked_single", "hidden_single", "naked_pair")]
+        self.fish_sizes = [size for (rule, size) in (("x_wing", 2), ("swordfish", 3)) if rule in self.rules]
+        self.trail = []  # (k, taboo mask before the elimination)
+        self.marks = []  # (trail length, pending regions, contradiction) at every push()
+        self.pending = set(range(3 * geometry.N))  # regions changed since the last propagate()
+        self.dirty = set()  # regions to look at in the running propagate()
+        self.contradiction = False  # the position has no solution
+        self.stats = {rule: [0, 0.0, 0] for rule in self.rules}  # rule -> [calls, seconds, candidates removed]
+
+    # ==========================================================================
+    # Incremental updates along the search tree
+
+    def push(self, k: int) -> None:
+        """ Records a value written in square k (call after CandidateEngine.place) """
+        self.marks.append((len(self.trail), self.pending, self.contradiction))
+        self.pending = self.pending.union(self.geometry.cell_regions[k])
+
+    def pop(self) -> None:
+        """ Takes back everything since the matching push() """
+        length, self.pending, self.contradiction = self.marks.pop()
+        trail, taboo = self.trail, self.candidates.taboo
+        while len(trail) > length:
+            k, mask = trail.pop()
+            taboo[k] = mask
+
+    def propagate(self, fish: bool = True) -> bool:
+        """ Applies the rules until nothing changes; returns False if the position has no solution.
+            With fish=False only the region rules are applied (the fish rules look at the whole board)
+        """
+        if not self.pending or self.contradiction:
+            return not self.contradiction
+        self.dirty, self.pending = set(self.pending), set()
+        stats, timer = self.stats, time.perf_counter
+        dirty = self.dirty
+        while not self.contradiction:
+            while dirty and not self.contradiction:
+                region = dirty.pop()
+                for rule in self.region_rules:
+                    start = timer()
+                    rule(region)
+                    counters = stats[rule.__name__]
+                    counters[0] += 1
+                    counters[1] += timer() - start
+            if self.contradiction:
+                break
+            for size in (self.fish_sizes if fish else ()):
+                start = timer()
+                self.fish(size)
+                counters = stats["x_wing" if size == 2 else "swordfish"]
+                counters[0] += 1
+                counters[1] += timer() - start
+            if not dirty:
+                break
+        return not self.contradiction
+
+    def eliminate(self, k: int, bits: int, rule: str) -> None:
+        """ Removes the values in bits from the candidates of square k """
+        mask = self.candidates.candidates(k)
+        removed = bits & mask
+        if not removed:
+            return
+        taboo = self.candidates.taboo
+        self.trail.append((k, taboo[k]))
+        taboo[k] |= removed
+        self.dirty.update(self.geometry.cell_regions[k])
+        self.stats[rule][2] += bin(removed).count("1")
+        if mask == removed:
+            self.contradiction = True
+
+    def used(self, region: int) -> int:
+        """ Returns the mask of the values filled in in region """
+        N, candidates = self.geometry.N, self.candidates
+        if region < N:
+            return candidates.row_used[region]
+        if region < 2 * N:
+            return candidates.col_used[region - N]
+        return candidates.block_used[region - 2 * N]
+
+    # ==========================================================================
+    # Rules on a single region
+
+    def naked_single(self, region: int) -> None:
+        candidates, squares, peers = self.candidates.candidates, self.candidates.squares, self.geometry.cell_peers
+        for k in self.geometry.region_cells[region]:
+            if squares[k]:
+                continue
+            mask = candidates(k)
+            if mask and not mask & (mask - 1):
+                for peer in peers[k]:
+                    if not squares[peer]:
+                        self.eliminate(peer, mask, "naked_single")
+
+    def hidden_single(self, region: int) -> None:
+        candidates, squares = self.candidates.candidates, self.candidates.squares
+        cells = [k for k in self.geometry.region_cells[region] if not squares[k]]
+        masks = [candidates(k) for k in cells]
+        # values with at least one / with at least two possible squares
+        once, twice = 0, 0
+        for mask in masks:
+            twice |= once & mask
+            once |= mask
+        if (once | self.used(region)) != self.candidates.full:
+            self.contradiction = True  # a value has no square left in this region
+            return
+        single = once & ~twice
+        if single:
+            for k, mask in zip(cells, masks):
+                value = mask & single
+                if value and mask != value:
+                    if value & (value - 1):
+                        self.contradiction = True  # two values can only go in the same square
+                        return
+                    self.eliminate(k, mask & ~value, "hidden_single")
+
+    def naked_pair(self, region: int) -> None:
+        candidates, squares = self.candidates.candidates, self.candidates.squares
+        cells = [k for k in self.geometry.region_cells[region] if not squares[k]]
+        seen = {}
+        for k in cells:
+            mask = candidates(k)
+            if bin(mask).count("1") != 2:
+                continue
+            if mask in seen:
+                pair = (seen[mask], k)
+                for other in cells:
+                    if other not in pair:
+                        self.eliminate(other, mask, "naked_pair")
+            else:
+                seen[mask] = k
+
+    # ==========================================================================
+    # Fish rules (x-wing, swordfish) on the whole board
+
+    def fish(self, size: int) -> None:
+        """ Applies the fish rule with size base lines, with rows and with columns as base lines """
+        N, candidates, squares = self.geometry.N, self.candidates.candidates, self.candidates.squares
+        rule = "x_wing" if size == 2 else "swordfish"
+        masks = [candidates(k) if not squares[k] else 0 for k in range(N * N)]
+        for v in range(N):
+            bit = 1 << v
+            # lines[i]: mask of the columns in which row i can take the value (and the transposed)
+            rows = [0] * N
+            columns = [0] * N
+            for k in range(N * N):
+                if masks[k] & bit:
+                    i, j = divmod(k, N)
+                    rows[i] |= 1 << j
+                    columns[j] |= 1 << i
+            for lines, by_row in ((rows, True), (columns, False)):
+                bases = [line for line in range(N) if 2 <= bin(lines[line]).count("1") <= size]
+                for group in combinations(bases, size):
+                    cover = 0
+                    for line in group:
+                        cover |= lines[line]
+                    if bin(cover).count("1") != size:
+                        continue
+                    # the value is in one of the cover lines of every base line: remove it elsewhere
+                    for line in range(N):
+                        if line in group or not lines[line] & cover:
+                            continue
+                        rest = lines[line] & cover
+                        while rest:
+                            low = rest & -rest
+                            other = low.bit_length() - 1
+                            k = line * N + other if by_row else other * N + line
+                            self.eliminate(k, bit, rule)
+                            rest ^= low
+
@@ -0,0 +1,45 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Scaling benchmark of the parallel root search: searches a fixed set of
+# positions with 1..N workers and reports nodes/sec and the depth reached.
+# The mode column says whether the search really ran on a process pool
+# ("parallel") or fell back to a serial search ("serial", see
+# parallel_search.py).
+#
+# Run it from the directory with simulate_game.py, with this team folder as a package:
+#   python -m team05_A1_v2.scaling_benchmark --workers 8 --seconds 5
+
+import argparse
+import os
+import time
+
+from .parallel_search import ParallelRootSearch
+from .positions import random_position
+
+# (m, n, fill) of the benchmark positions: 9x9 and 16x16 boards in the middle game
+POSITIONS = [(3, 3, 0.4), (3, 3, 0.6), (4, 4, 0.5)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the parallel root search")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="largest number of workers")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time budget per position")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'position':>12} {'mode':>8} {'nodes':>10} {'nodes/sec':>10} {'depth':>5}")
+    for workers in range(1, args.workers + 1):
+        for (m, n, fill) in POSITIONS:
+            game_state = random_position(m, n, fill, seed=1)
+            search = ParallelRootSearch(lambda i, j, value: None, args.seconds, workers)
+            start = time.perf_counter()
+            search.minimax(game_state)
+            elapsed = time.perf_counter() - start
+            mode = "serial" if search.serial else "parallel"
+            print(f"{workers:>7} {f'{m}x{n} {fill:.0%}':>12} {mode:>8} {search.nodes:>10} "
+                  f"{search.nodes / elapsed:>10.0f} {search.depth:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,532 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Iterative deepening alpha-beta search shared by the SudokuAI variants.
+#
+# The whole tree is walked on one mutable SearchState: every child is visited
+# with state.apply(move) ... state.undo(), so no game state is copied inside
+# the search and memory use stays flat as the depth grows.
+#
+# Positions that are reached through different move orders, or again in the
+# next iteration of the deepening loop, are looked up in a transposition table
+# keyed by the Zobrist hash of the state. Values are stored relative to the
+# evaluation of the position itself (the points still to be won from there),
+# because the scores collected on the way to a position depend on the path.
+#
+# The children of a node are pruned by the stages of a MovePipeline and
+# searched in the order given by MoveOrdering (table move, scoring moves, killer
+# moves, history table), so cutoffs come early. They are generated lazily in
+# that order: the table move is tried before any other move is generated, and
+# the quiet moves are only sorted when the moves before them did not cause a
+# cutoff.
+#
+# With canonical_keys the table is keyed on the canonical form of the position
+# under the symmetries of the board (see symmetry.py), so positions that are
+# mirror images of each other share their entries; the moves in the table are
+# then stored in the canonical frame.
+#
+# At the horizon (depth 0) a quiescence search continues with the scoring moves
+# only, until no region can be completed any more, so the leaves are not
+# evaluated in the middle of an exchange of points. It has a node budget per
+# horizon node and the usual stand-pat cutoff: the player to move may also
+# play a quiet move, so the static evaluation bounds the value.
+#
+# The search is a principal variation search: the first child of a node is
+# searched with the full window, the others only with a null window probe that
+# checks whether they beat the best value so far, and are re-searched with the
+# full window when they do. Every new depth of the deepening loop starts with
+# an aspiration window around the value of the previous depth, widened when the
+# value falls outside of it. Scores are integers, so a null window is (a, a+1).
+#
+# The root moves are searched in the order of their scores in the previous
+# depth. A root move that beats the best move of the depth so far is proposed
+# right away, so a depth that runs out of time still counts for the move that
+# is played.
+
+# half width of the first aspiration window, and the width beyond which the window is opened completely
+ASPIRATION_WINDOW = 2
+ASPIRATION_LIMIT = 64
+
+import numpy as np
+
+from .search_state import SearchState
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER
+from .move_ordering import MoveOrdering
+from .time_manager import TimeManager
+from .instrumentation import SearchTrace
+from .move_pipeline import MovePipeline, move_pipeline
+from .symmetry import board_symmetry
+from .candidates import mask_values
+from .frontier import FrontierEvaluator
+
+
+class AlphaBetaSearch(object):
+    """
+    Iterative deepening alpha-beta search that proposes the best move found after every completed depth.
+    """
+
+    def __init__(self, propose_move, max_seconds: float, transposition_table: TranspositionTable = None,
+                 pipeline: MovePipeline = None, trace: SearchTrace = None):
+        self.propose_move = propose_move  # callback receiving (i, j, value) of the best move so far
+        self.max_seconds = max_seconds  # time budget per move
+        self.clock = TimeManager(max_seconds)
+        self.tt = transposition_table if transposition_table is not None else TranspositionTable()
+        self.ordering = MoveOrdering()
+        self.pipeline = pipeline if pipeline is not None else move_pipeline()  # pruning of the children
+        self.propagation = self.pipeline.propagation()  # propagation rules the search state needs
+        self.timed_out = False
+        self.root_player = 0  # index in state.scores of the player to move at the root
+        self.root_ply = 0  # state.ply at the root, to know the distance of a node from the root
+        self.nodes = 0
+        self.canonical_keys = False  # key the transposition table on the canonical form under board symmetries
+        self.symmetry = None  # Symmetry of the board shape while canonical_keys is used
+        self.root_taboo = []  # taboo moves of the root as (k, value) pairs, part of the canonical keys
+        self.parity_weight = 0  # weight of the region parity term of the evaluation; 0 disables it
+        self.batch_frontier = True  # evaluate the children of depth 1 nodes in one batch (see frontier.py)
+        self.frontier_min_empty = 48  # with fewer empty squares the plain loop over the children is as fast
+        self.frontier = None  # FrontierEvaluator of the board shape, set in start()
+        self.quiescence_budget = 64  # nodes of the quiescence search below one horizon node; 0 disables it
+        self.quiescence_nodes = 0  # nodes left in the budget of the current quiescence search
+        self.memory = None  # snapshot() of the search of an earlier move to continue from; see restore()
+        self.save_snapshot = None  # callback receiving snapshot() after every completed depth; None disables it
+        self.first_move = None  # move searched first at depth 1, the continuation of the restored principal variation
+        self.best_move = None  # move proposed last, possibly from a depth that was not completed
+        self.root_scores = {}  # root move -> its score in the latest search of it, to order the root moves
+        self.depth = 0  # deepest depth completed by minimax
+        self.value = None  # value of the best move at that depth
+        self.depth_move = None  # best move at that depth; best_move may come from a later, unfinished depth
+        if trace is not None:
+            trace.attach(self)  # instruments this instance only; without a trace nothing is wrapped
+
+    # ==========================================================================
+    # Evaluation function that assigns a numerical score to any state
+
+    def evaluate(self, state: SearchState):
+        """ Return numerical evaluation of state
+            (=difference in points between the player to move at the root and their opponent)
+        """
+        value = state.scores[self.root_player] - state.scores[1 - self.root_player]
+        if self.parity_weight:
+            # regions with an odd number of empty squares count for the player to move
+            odd = sum(empty & 1 for empty in state.empty_in_region)
+            value += self.parity_weight * odd if state.ply % 2 == self.root_player else -self.parity_weight * odd
+        return value
+
+    # ==========================================================================
+    # Function to obtain the moves to all the children of a state
+
+    def getChildren(self, state: SearchState, first_move=None, ply: int = 0, depth: int = None):
+        """ Generates the moves leading to the children of state, most promising first
+            (depth is the remaining search depth of state, None at the root)
+        """
+        # the pruning stages that work on the candidates (a position without any solution cannot be reached
+        # in a game, so it gets no children)
+        if not self.pipeline.prepare(state, depth):
+            return
+
+        # the table move is searched before any other move is generated
+        if first_move is not None and state.is_legal(first_move):
+            yield first_move
+
+        # the pruning stages that generate and filter the moves, then the move ordering (which generates
+        # the legal moves itself when no stage restricts them)
+        moves = self.pipeline.moves(state)
+        yield from self.ordering.staged(state, moves, first_move, ply)
+
+    # ==========================================================================
+    # Minimax tree search algorithm
+
+    def max_value(self, state: SearchState, depth, alpha, beta, first_move=None):
+        # Calculate best value and move for the maximizing player
+        ply = state.ply - self.root_ply
+        value, best_move = float("-inf"), None
+        for move in self.getChildren(state, first_move, ply, depth):
+            state.apply(move)
+            if best_move is None or alpha == float("-inf"):
+                score = self.alpha_beta(state, depth - 1, alpha, beta)
+            else:
+                # null window probe: does the move beat alpha?
+                score = self.alpha_beta(state, depth - 1, alpha, alpha + 1)
+                if alpha < score < beta:
+                    score = self.alpha_beta(state, depth - 1, alpha, beta)
+            state.undo()
+            if score > value:
+                value, best_move = score, move
+            if value >= beta:
+                self.ordering.cutoff(state, move, ply, depth)
+                return value, best_move
+            alpha = max(alpha, value)
+        if best_move is None:
+            return self.evaluate(state), None
+        return value, best_move
+
+    def min_value(self, state: SearchState, depth, alpha, beta, first_move=None):
+        # Calculate best value and move for the minimizing player
+        ply = state.ply - self.root_ply
+        value, best_move = float("inf"), None
+        for move in self.getChildren(state, first_move, ply, depth):
+            state.apply(move)
+            if best_move is None or beta == float("inf"):
+                score = self.alpha_beta(state, depth - 1, alpha, beta)
+            else:
+                # null window probe: does the move stay below beta?
+                score = self.alpha_beta(state, depth - 1, beta - 1, beta)
+                if alpha < score < beta:
+                    score = self.alpha_beta(state, depth - 1, alpha, beta)
+            state.undo()
+            if score < value:
+                value, best_move = score, move
+            if value <= alpha:
+                self.ordering.cutoff(state, move, ply, depth)
+                return value, best_move
+            beta = min(beta, value)
+        if best_move is None:
+            return self.evaluate(state), None
+        return value, best_move
+
+    def alpha_beta(self, state: SearchState, depth, alpha, beta):
+        """ Heuristic alpha beta pruning up to the given depth """
+        self.nodes += 1
+        if self.clock.out_of_time():
+            self.timed_out = True
+            return self.evaluate(state)
+        if depth <= 0:
+            if self.quiescence_budget > 0:
+                self.quiescence_nodes = self.quiescence_budget
+                return self.quiescence(state, alpha, beta)
+            return self.evaluate(state)
+
+        # look the position up in the transposition table
+        static = self.evaluate(state)
+        tt_move = None
+        key, transform = self.table_key(state)
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, bound, tt_value, tt_move = entry
+            if transform is not None and tt_move is not None:
+                tt_move = self.symmetry.from_canonical(tt_move, transform)
+            if tt_depth >= depth:
+                tt_value += static
+                if bound == EXACT \
+                        or (bound == LOWER and tt_value >= beta) \
+                        or (bound == UPPER and tt_value <= alpha):
+                    return tt_value
+
+        if depth == 1 and self.frontier is not None and state.empty >= self.frontier_min_empty:
+            value, best_move = self.frontier_value(state, alpha, beta)
+        elif state.ply % 2 == self.root_player:
+            value, best_move = self.max_value(state, depth, alpha, beta, tt_move)
+        else:
+            value, best_move = self.min_value(state, depth, alpha, beta, tt_move)
+
+        # results of an interrupted search are not reliable, so they are not stored
+        if not self.timed_out:
+            bound = UPPER if value <= alpha else LOWER if value >= beta else EXACT
+            if transform is not None and best_move is not None:
+                best_move = self.symmetry.to_canonical(best_move, transform)
+            self.tt.store(key, depth, bound, value - static, best_move)
+        return value
+
+    def frontier_children(self, state: SearchState):
+        """ Returns (squares, evaluations, quiet) of the children of state as arrays: the squares with a move, the
+            evaluation of the children (exact for the quiet ones, a bound for the others) and whether they are quiet
+        """
+        squares, points, quiet, odd_change = self.frontier.children(state, self.pipeline.scoring_only())
+        sign = 1 if state.ply % 2 == self.root_player else -1
+        evaluations = state.scores[self.root_player] - state.scores[1 - self.root_player] + sign * points
+        if self.parity_weight:
+            odd = sum(empty & 1 for empty in state.empty_in_region)
+            evaluations = evaluations - sign * self.parity_weight * (odd + odd_change)
+        return squares, evaluations, quiet
+
+    def frontier_value(self, state: SearchState, alpha, beta):
+        """ Value and best move of a node with remaining depth 1, from the batched evaluations of its children;
+            only the children that are not quiet and may beat the best quiet child are searched
+        """
+        if not self.pipeline.prepare(state, 1):
+            return self.evaluate(state), None
+        # the batch is not counted in the nodes: the clock predicts the next depth from them, and the children
+        # alpha-beta would have cut off are in it as well
+        squares, evaluations, quiet = self.frontier_children(state)
+        if not len(squares):
+            return self.evaluate(state), None
+        ply = state.ply - self.root_ply
+        maximizing = state.ply % 2 == self.root_player
+        if not maximizing:
+            evaluations = -evaluations
+            alpha, beta = -beta, -alpha
+
+        # from here on the node is a max node over the (negated) evaluations
+        value, best_move = float("-inf"), None
+        if quiet.any():
+            index = int(np.argmax(np.where(quiet, evaluations, evaluations.min() - 1)))
+            value = evaluations[index].item()
+            k = int(squares[index])
+            best_move = (k, mask_values(state.candidates.candidates(k))[0])
+        if value < beta:
+            alpha = max(alpha, value)
+            loud = np.flatnonzero(~quiet & (evaluations > value))
+            for index in loud[np.argsort(-evaluations[loud], kind="stable")].tolist():
+                if evaluations[index] <= value:
+                    break
+                k = int(squares[index])
+                for number in mask_values(state.candidates.candidates(k)):
+                    state.apply((k, number))
+                    score = self.alpha_beta(state, 0, *((alpha, beta) if maximizing else (-beta, -alpha)))
+                    state.undo()
+                    score = score if maximizing else -score
+                    if score > value:
+                        value, best_move = score, (k, number)
+                        alpha = max(alpha, value)
+                    if value >= beta:
+                        break
+                if value >= beta:
+                    break
+        if value >= beta and best_move is not None:
+            self.ordering.cutoff(state, best_move, ply, 1)
+        return (value if maximizing else -value), best_move
+
+    def quiescence(self, state: SearchState, alpha, beta):
+        """ Searches only the scoring moves below the horizon, until the position is quiet
+            or the node budget is used up
+        """
+        # stand pat: the player to move does not have to score, so the static evaluation is a bound
+        value = self.evaluate(state)
+        self.quiescence_nodes -= 1
+        if self.quiescence_nodes <= 0 or self.clock.out_of_time():
+            return value
+        moves = state.scoring_moves()
+        if not moves:
+            return value
+
+        if state.ply % 2 == self.root_player:
+            if value >= beta:
+                return value
+            alpha = max(alpha, value)
+            for move in self.ordering.order(state, moves):
+                self.nodes += 1
+                state.apply(move)
+                score = self.quiescence(state, alpha, beta)
+                state.undo()
+                if score > value:
+                    value = score
+                    if value >= beta:
+                        break
+                    alpha = max(alpha, value)
+        else:
+            if value <= alpha:
+                return value
+            beta = min(beta, value)
+            for move in self.ordering.order(state, moves):
+                self.nodes += 1
+                state.apply(move)
+                score = self.quiescence(state, alpha, beta)
+                state.undo()
+                if score < value:
+                    value = score
+                    if value <= alpha:
+                        break
+                    beta = min(beta, value)
+        return value
+
+    def start(self, state: SearchState) -> None:
+        """ Prepares a new search with state as the root """
+        self.timed_out = False
+        self.nodes = 0
+        self.depth, self.value, self.depth_move = 0, None, None
+        self.best_move, self.root_scores = None, {}
+        self.root_player = state.ply % 2
+        self.root_ply = state.ply
+
+        self.pipeline.start(state)
+
+        self.frontier = FrontierEvaluator(state.geometry) if self.batch_frontier else None
+        self.symmetry = board_symmetry(state.geometry.m, state.geometry.n) if self.canonical_keys else None
+        self.root_taboo = [(k, value) for (k, mask) in enumerate(state.candidates.taboo) if mask
+                           for value in mask_values(mask)]
+
+        # positions where a region is about to be completed get the whole budget
+        self.clock.start(critical=any(0 < empty <= 2 for empty in state.empty_in_region))
+
+    def propose(self, state: SearchState, move) -> None:
+        """ Makes move the move that is played """
+        self.best_move = move
+        i, j = state.geometry.cell_coordinates[move[0]]
+        self.propose_move(i, j, move[1])
+
+    def order_root(self, moves: list, first_move) -> list:
+        """ Returns the root moves with first_move first, then by their latest scores """
+        scores = self.root_scores
+        return sorted(moves, key=lambda move: (move == first_move, scores.get(move, float("-inf"))), reverse=True)
+
+    def search_root(self, state: SearchState, moves, depth, alpha, beta):
+        """ Principal variation search of the root moves; returns the best value and move """
+        value, best_move = float("-inf"), None
+        for move in moves:
+            state.apply(move)
+            if best_move is None or alpha == float("-inf"):
+                score = self.alpha_beta(state, depth - 1, alpha, beta)
+            else:
+                score = self.alpha_beta(state, depth - 1, alpha, alpha + 1)
+                if alpha < score < beta:
+                    score = self.alpha_beta(state, depth - 1, alpha, beta)
+            state.undo()
+            if self.timed_out:
+                break
+            self.root_scores[move] = score
+            # find the optimal minimax solution
+            if score > value or best_move is None:
+                # a score above alpha is a lower bound, so the move is better than the best move so far: it is
+                # proposed at once, in case the time runs out before the depth is complete
+                if self.best_move is None or (best_move is not None and score > alpha and move != self.best_move):
+                    self.propose(state, move)
+                value, best_move = score, move
+            if value >= beta:
+                break
+            alpha = max(alpha, value)
+        return value, best_move
+
+    def table_key(self, state: SearchState):
+        """ Returns (key, transform) of state in the transposition table: the Zobrist hash, or with canonical keys
+            the key of the canonical form and the symmetry that maps state to it
+        """
+        if self.symmetry is not None:
+            return self.symmetry.canonical(state.squares, state.candidates.row_used, state.candidates.col_used,
+                                           state.ply, self.root_taboo)
+        return state.hash, None
+
+    def probe(self, state: SearchState):
+        """ Returns the transposition table entry (depth, bound type, value, best move) of state with the absolute
+            value and the move in the frame of state, or None
+        """
+        key, transform = self.table_key(state)
+        entry = self.tt.probe(key)
+        if entry is None:
+            return None
+        depth, bound, value, move = entry
+        if transform is not None and move is not None:
+            move = self.symmetry.from_canonical(move, transform)
+        return depth, bound, value + self.evaluate(state), move
+
+    def principal_variation(self, state: SearchState, best_move, max_length: int) -> list:
+        """ Returns the moves of the principal variation of state: best_move, followed by the best moves stored
+            in the transposition table (the root itself is not stored)
+        """
+        state.apply(best_move)
+        moves = [best_move]
+        while len(moves) < max_length:
+            entry = self.probe(state)
+            if entry is None or entry[3] is None or not state.is_legal(entry[3]):
+                break
+            state.apply(entry[3])
+            moves.append(entry[3])
+        for _ in moves:
+            state.undo()
+        return moves
+
+    def continuation_keys(self, state: SearchState, pv) -> list:
+        """ Returns the table keys of the positions along the principal variation pv of state and of all their
+            children, i.e. the positions the next searches of the game are expected to start from or pass through
+        """
+        keys = []
+        for move in pv:
+            state.apply(move)
+            keys.append(self.table_key(state)[0])
+            for child in state.legal_moves():
+                state.apply(child)
+                keys.append(self.table_key(state)[0])
+                state.undo()
+        for _ in pv:
+            state.undo()
+        return keys
+
+    def snapshot(self, state: SearchState, best_move) -> dict:
+        """ Returns what the search of a later move can reuse as a picklable dictionary: the transposition table
+            entries along the principal variation of state starting with best_move, the killer and history tables
+            and that principal variation
+        """
+        pv = self.principal_variation(state, best_move, self.depth)
+        return {"shape": (state.geometry.m, state.geometry.n), "ply": state.ply, "squares": bytes(state.squares),
+                "canonical_keys": self.symmetry is not None, "pv": pv,
+                "tt": self.tt.snapshot(self.continuation_keys(state, pv)), "ordering": self.ordering.snapshot()}
+
+    def restore(self, snapshot: dict, state: SearchState) -> bool:
+        """ Continues from the snapshot() of an earlier position of the same game with the same player to move;
+            returns False if state is not a continuation of it
+        """
+        plies = state.ply - snapshot["ply"]
+        if snapshot["shape"] != (state.geometry.m, state.geometry.n) or plies <= 0 or plies % 2:
+            return False
+        squares = state.squares
+        if any(value and squares[k] != value for (k, value) in enumerate(snapshot["squares"])):
+            return False
+        # the values in the table are relative to the static evaluation of the same player, so they stay valid;
+        # the keys only match when both searches use the same kind of keys
+        if snapshot["canonical_keys"] == (self.symmetry is not None):
+            self.tt.restore(snapshot["tt"])
+        self.ordering.restore(snapshot["ordering"], plies)
+        # when the game followed the principal variation, its next move is searched first
+        pv = snapshot["pv"]
+        if len(pv) > plies and all(squares[k] == value for (k, value) in pv[:plies]):
+            self.first_move = tuple(pv[plies])
+        return True
+
+    def minimax(self, game_state):
+        """ Iterative deepening: repeatedly searches the position with increasing depth limits
+            and proposes the best move of every depth that was completed in time
+        """
+        state = SearchState(game_state, self.propagation)
+        self.start(state)
+        max_depth = state.empty_count()
+
+        best_move, best_value, first_depth = None, None, 1
+        if self.memory is not None and self.restore(self.memory, state):
+            # the depths the earlier search already completed for this position are not searched again
+            entry = self.probe(state)
+            if entry is not None and entry[1] == EXACT and entry[3] is not None and state.is_legal(entry[3]):
+                self.depth, best_value, best_move = entry[0], entry[2], entry[3]
+                self.value, self.depth_move, first_depth = best_value, best_move, self.depth + 1
+                self.propose(state, best_move)
+        for depth in range(first_depth, max_depth + 1):
+            # only start depths that are expected to finish in time (the first depth is always searched)
+            if not self.clock.start_iteration(self.nodes) and best_move is not None:
+                break
+            # the best move of the previous depth is searched first, the others in the order of their scores
+            moves = list(self.getChildren(state, best_move or self.first_move))
+            if not moves:
+                break
+            moves = self.order_root(moves, best_move or self.first_move)
+
+            # aspiration window around the value of the previous depth
+            if best_value is None:
+                window = float("inf")
+            else:
+                window = ASPIRATION_WINDOW
+            alpha, beta = (best_value or 0) - window, (best_value or 0) + window
+            while True:
+                value, depth_best_move = self.search_root(state, moves, depth, alpha, beta)
+                if self.timed_out or alpha < value < beta:
+                    break
+                # the value fell outside of the window: widen it on that side and search again
+                window *= 2
+                if window > ASPIRATION_LIMIT:
+                    window = float("inf")
+                if value <= alpha:
+                    alpha = best_value - window
+                else:
+                    beta = best_value + window
+                moves = self.order_root(moves, depth_best_move)
+
+            # a depth that ran out of time is not searched completely, so it is not recorded or saved; only the
+            # moves search_root proposed from it are used
+            if depth_best_move is None or self.timed_out:
+                break
+            best_move, best_value = depth_best_move, value
+            self.depth, self.value, self.depth_move = depth, value, best_move
+            self.clock.iteration_done(self.nodes)
+            # Propose best move
+            self.propose(state, best_move)
+            if self.save_snapshot is not None:
+                self.save_snapshot(self.snapshot(state, best_move))
+        return self.best_move
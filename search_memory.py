@@ -0,0 +1,77 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Search knowledge that is kept between the moves of a game.
+#
+# The framework runs compute_best_move in a new process for every move and
+# stops it when the time is up, so nothing survives in memory. After every
+# completed depth the search passes its snapshot() to SearchMemory.save():
+#   - the transposition table entries of the positions along the principal
+#     variation and of their children (one of them is the position of our
+#     next move when the opponent replies with another move),
+#   - the killer and history tables,
+#   - the principal variation,
+# and the search of our next move restores it before its first depth (see
+# AlphaBetaSearch.restore). The snapshot is at most a few thousand small
+# tuples, so it is pickled and unpickled in milliseconds.
+#
+# The snapshot is pickled to the file given by the caller (SudokuAI.memory_file).
+# Without one, the save() / load() methods of the framework's SudokuAI are used
+# when the framework has them, and otherwise a file in the working directory
+# (per player_number when the framework sets one). A snapshot that cannot be
+# written is skipped, and a file that is missing, truncated (the process may
+# be stopped while writing), unreadable or from another game is ignored: the
+# search then runs without memory.
+
+import os
+import pickle
+
+# the items of AlphaBetaSearch.snapshot()
+SNAPSHOT_KEYS = {"shape", "ply", "squares", "canonical_keys", "pv", "tt", "ordering"}
+
+
+class SearchMemory(object):
+    """
+    Stores the snapshot of the last search of a player between moves.
+    """
+
+    def __init__(self, ai, filename: str = None):
+        self.ai = ai  # the SudokuAI, for the save() / load() of the framework
+        self.filename = filename  # file of the snapshot; None: the framework's save() / load() or the default file
+
+    def file(self) -> str:
+        """ Returns the file the snapshot is pickled to """
+        if self.filename is not None:
+            return self.filename
+        # the framework of assignments 1 and 2 has no player_number
+        return f"search_memory_{getattr(self.ai, 'player_number', 1)}.pkl"
+
+    def save(self, snapshot: dict) -> None:
+        """ Stores snapshot, replacing the previous one; does nothing if it cannot be stored """
+        try:
+            save = getattr(self.ai, "save", None)
+            if self.filename is None and save is not None:
+                save(snapshot)
+                return
+            # write a temporary file first, so a stopped process never leaves half a snapshot behind
+            filename = self.file()
+            temporary = filename + ".tmp"
+            with open(temporary, "wb") as file:
+                pickle.dump(snapshot, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, filename)
+        except (OSError, pickle.PicklingError):
+            pass
+
+    def load(self):
+        """ Returns the stored snapshot, or None if there is no usable one """
+        try:
+            load = getattr(self.ai, "load", None)
+            if self.filename is None and load is not None:
+                snapshot = load()
+            else:
+                with open(self.file(), "rb") as file:
+                    snapshot = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError, ValueError):
+            return None  # also the errors of unpickling a snapshot of an older version of the classes
+        return snapshot if isinstance(snapshot, dict) and SNAPSHOT_KEYS <= snapshot.keys() else None
@@ -0,0 +1,193 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Mutable search state with make/unmake move application.
+#
+# The tree search walks a single SearchState: apply(move) writes the value,
+# updates the scores and pushes the move on the history, and undo() reverts
+# exactly that. No GameState is copied inside the search; the framework
+# GameState is only read once when the state is created, and the search only
+# hands moves back to compute_best_move.
+#
+# The state is compact: the classes use __slots__, the board is a bytearray
+# (in the candidate engine), taboo moves are a bitmask per cell, and the move
+# history is a persistent linked list of (k, value, points, parent) tuples,
+# so a move costs one small tuple and a reference to the history shares all
+# earlier moves.
+#
+# The state also keeps the number of empty squares per row, column and block,
+# updated on every apply() and undo(), so the points of a move can be read in
+# O(1) from the three counters of its cell, and the number of regions with a
+# single empty square, so quiet positions are recognized without a scan.
+#
+# The Zobrist hash of the board and the side to move is updated with two XORs
+# per move and keys the transposition table.
+#
+# With propagation enabled, a Propagator removes the candidates that have no
+# solution (moves the game would declare taboo) from the candidate engine; it
+# follows apply() / undo() with its own trail.
+
+from .geometry import board_geometry
+from .candidates import CandidateEngine, mask_values
+from .zobrist import zobrist_keys
+from .propagation import Propagator, RULES
+
+# dictionary with scores based on how many regions the move completes
+dct_scores = {0: 0,  # completing 0 regions will give 0 points
+              1: 1,  # completing 1 region will give 1 points
+              2: 3,  # completing 2 regions will give 3 points
+              3: 7}  # completing 3 regions will give 7 points
+
+
+class SearchState(object):
+    """
+    Board, scores and move history of a position in the search tree.
+    Moves are (k, value) pairs with k the flat cell index of the geometry.
+    """
+    __slots__ = ("geometry", "candidates", "squares", "scores", "ply", "history", "empty_in_region", "ready_regions",
+                 "empty", "zobrist", "hash", "propagator")
+
+    def __init__(self, game_state, propagation=()):
+        board = game_state.board
+        geometry = board_geometry(board.m, board.n)
+        self.setup(CandidateEngine(geometry, board.squares, game_state.taboo_moves),
+                   game_state.scores, len(game_state.moves), propagation)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, propagation=()):
+        """ Returns the state saved by snapshot() (for instance in another process) """
+        m, n, squares, taboo, ply, scores = snapshot
+        candidates = CandidateEngine(board_geometry(m, n), squares)
+        candidates.taboo = list(taboo)
+        state = cls.__new__(cls)
+        state.setup(candidates, scores, ply, propagation)
+        return state
+
+    def snapshot(self) -> tuple:
+        """ Returns the position as a small picklable tuple; the move history is not included """
+        return (self.geometry.m, self.geometry.n, bytes(self.squares), list(self.candidates.taboo),
+                self.ply, list(self.scores))
+
+    def setup(self, candidates: CandidateEngine, scores, ply: int, propagation=()) -> None:
+        self.geometry = candidates.geometry
+        self.candidates = candidates
+        self.squares = self.candidates.squares  # shared with the candidate engine
+        self.scores = list(scores)
+        self.ply = ply  # number of moves played so far, decides whose turn it is
+        self.history = None  # (k, value, points, parent) of the last applied move, None if there is none
+
+        # amount of empty squares per region and on the whole board
+        self.empty_in_region = [sum(1 for k in cells if not self.squares[k]) for cells in self.geometry.region_cells]
+        self.ready_regions = self.empty_in_region.count(1)  # regions with exactly one empty square
+        self.empty = self.squares.count(0)
+
+        # Zobrist hash of the board contents and the side to move
+        self.zobrist = zobrist_keys(self.geometry)
+        self.hash = self.zobrist.hash_board(self.squares, self.ply)
+
+        # removes candidates without a solution with the rules in propagation (True: all rules);
+        # None when propagation is disabled
+        self.propagator = None
+        if propagation:
+            self.propagator = Propagator(candidates, RULES if propagation is True else propagation)
+
+    def current_player(self) -> int:
+        """ Returns the player to move (1 or 2) """
+        return 1 if self.ply % 2 == 0 else 2
+
+    def points(self, k: int) -> int:
+        """ Returns the points for filling the empty cell k: a region is completed when k is its last empty square """
+        empty_in_region = self.empty_in_region
+        row, column, block = self.geometry.cell_regions[k]
+        return dct_scores[(empty_in_region[row] == 1) + (empty_in_region[column] == 1) + (empty_in_region[block] == 1)]
+
+    def score_moves(self, moves) -> list:
+        """ Returns the points of every move in moves """
+        points = self.points
+        return [points(k) for (k, value) in moves]
+
+    def ready_squares(self) -> set:
+        """ Returns the squares that are the last empty square of a row, column or block """
+        ready = set()
+        if not self.ready_regions:
+            return ready
+        squares, region_cells = self.squares, self.geometry.region_cells
+        for region, empty in enumerate(self.empty_in_region):
+            if empty == 1:
+                ready.update(k for k in region_cells[region] if not squares[k])
+        return ready
+
+    def scoring_moves(self) -> list:
+        """ Returns the legal moves on the ready squares, without generating the moves of the other squares """
+        candidates = self.candidates.candidates
+        return [(k, value) for k in sorted(self.ready_squares()) for value in mask_values(candidates(k))]
+
+    def apply(self, move) -> None:
+        """ Plays move for the player to move """
+        k, value = move
+        points = self.points(k)
+        self.candidates.place(k, value)
+        if self.propagator is not None:
+            self.propagator.push(k)
+        empty_in_region = self.empty_in_region
+        for region in self.geometry.cell_regions[k]:
+            empty = empty_in_region[region] - 1
+            empty_in_region[region] = empty
+            if empty == 1:
+                self.ready_regions += 1
+            elif empty == 0:
+                self.ready_regions -= 1
+        self.empty -= 1
+        self.scores[self.ply % 2] += points
+        self.history = (k, value, points, self.history)
+        self.ply += 1
+        self.hash ^= self.zobrist.key(k, value) ^ self.zobrist.side_key
+
+    def undo(self) -> None:
+        """ Takes back the last applied move """
+        k, value, points, self.history = self.history
+        self.hash ^= self.zobrist.key(k, value) ^ self.zobrist.side_key
+        self.ply -= 1
+        self.scores[self.ply % 2] -= points
+        self.candidates.remove(k)
+        if self.propagator is not None:
+            self.propagator.pop()
+        empty_in_region = self.empty_in_region
+        for region in self.geometry.cell_regions[k]:
+            empty = empty_in_region[region] + 1
+            empty_in_region[region] = empty
+            if empty == 1:
+                self.ready_regions += 1
+            elif empty == 2:
+                self.ready_regions -= 1
+        self.empty += 1
+
+    def moves(self) -> list:
+        """ Returns the applied moves, the first one first """
+        moves = []
+        node = self.history
+        while node is not None:
+            moves.append((node[0], node[1]))
+            node = node[3]
+        moves.reverse()
+        return moves
+
+    def propagate(self, fish: bool = True) -> bool:
+        """ Removes the candidates without a solution; returns False if the position has no solution at all """
+        if self.propagator is None:
+            return True
+        return self.propagator.propagate(fish)
+
+    def is_legal(self, move) -> bool:
+        """ Returns whether move can be played in the position (moves from other positions are checked with this) """
+        k, value = move
+        return bool(self.candidates.candidates(k) >> (value - 1) & 1)
+
+    def legal_moves(self) -> list:
+        """ Returns all legal moves of the position """
+        return self.candidates.legal_moves()
+
+    def empty_count(self) -> int:
+        """ Returns the number of empty squares """
+        return self.empty
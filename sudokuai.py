@@ -4,10 +4,20 @@
 
 import random
 import time
-from competitive_sudoku.sudoku import GameState, Move, SudokuBoard, TabooMove
+from competitive_sudoku.sudoku import GameState, Move, SudokuBoard
 import competitive_sudoku.sudokuai
-import numpy as np
-import copy
+from .geometry import board_geometry
+from .move_tensor import MoveTensor
+from .symmetry import board_symmetry
+from .opening_book import opening_book
+from .search import AlphaBetaSearch
+from .move_pipeline import move_pipeline
+from .instrumentation import SearchTrace
+from .parallel_search import ParallelRootSearch
+from .mcts import MonteCarloTreeSearch
+from .endgame import EndgameSolver, ENDGAME_THRESHOLDS
+from .search_state import SearchState
+from .search_memory import SearchMemory
 
 class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
     """
@@ -16,9 +26,23 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
 
     def __init__(self):
         super().__init__()
+        self.time_budget = 1  # seconds per move; set it to the time limit of the game that is played
+        self.workers = 1  # number of processes for the search; more than 1 splits the root moves over a process pool
+        self.trace_file = None  # JSONL file that gets a trace record of the search of every move; None disables it
+        self.pipeline = "default"  # pruning of the children, one of the configurations in move_pipeline.py
+        self.engine = "alphabeta"  # search engine: "alphabeta" or "mcts" (Monte Carlo Tree Search)
+        self.engines = {}  # board shape (m, n) -> engine, for the board sizes that use another engine
+        # board shape (m, n) -> number of empty squares up to which the endgame is solved exactly
+        self.endgame_thresholds = dict(ENDGAME_THRESHOLDS)
+        self.canonical_keys_fill = 0.05  # filled fraction of the board below which the search uses canonical keys
+        self.persistent = True  # continue the alpha-beta search of our previous move (see search_memory.py)
+        self.memory_file = None  # file for that search memory; None uses the framework's save() / load() if present
 
     # N.B. This is a very naive implementation.
     def compute_best_move(self, game_state: GameState) -> None:
+        # the endgame solver and the search share the time budget of the move
+        start_time = time.perf_counter()
+
         # ==========================================================================
         # Generate all legal moves from a given game state / board position
 
@@ -28,57 +52,41 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         self.m = game_state.board.m  # block is m squares high || board is m squares wide
         self.squares = game_state.board.squares  # list of all values (row-wise)
 
-        # grouping the squares in the same region together (a region is either a row, a column or a block)
-        self.dct_regions = {}
-
-        for index in range(self.N):
-            self.dct_regions[f"row{index}"] = [(index, j) for j in range(self.N)]  # squares in the same row
-            self.dct_regions[f"column{index}"] = [(i, index) for i in range(self.N)]  # squares in the same column
-
-        counter = 1
-        for width in range(self.n):
-            for height in range(self.m):
-                self.dct_regions[f"block{counter}"] = [(i, j) for i in range(width * self.m, width * self.m + self.m)
-                                                       for j in range(height * self.n,
-                                                                      height * self.n + self.n)]  # squares in the same block
-                counter += 1
-
-        # function that checks if the move would be possible according to some constraints
-        def possible(i, j, value):
-            """ Checks whether
-                - the cell the move is going to be made in is empty,
-                - the move is not a taboo move, and
-                - the value that would be written in the cell is not already in another
-                  cell in the same row, column or block (check for uniqueness)
-            """
-
-            # all groups of cells that cell (i, j) is part of
-            regions_with_ij = [group for group in list(self.dct_regions.values()) if (i, j) in group]
-
-            # all values that are already in the same row, column or block which cell (i, j) is part of;
-            # making a move by filling in these values in cell (i, j) would make the move illegal
-            values_already_in_rcb_ij = set(
-                [game_state.board.get(i, j) for group in regions_with_ij for (i, j) in group])
-
-            return game_state.board.get(i, j) == SudokuBoard.empty \
-                   and not TabooMove(i, j, value) in game_state.taboo_moves \
-                   and value not in values_already_in_rcb_ij
-
-        # all legal moves
-        self.all_moves = [Move(i, j, value) for i in range(self.N) for j in range(self.N)
-                          for value in range(1, self.N + 1) if possible(i, j, value)]
-        self.all_moves_tuples = [((move.i, move.j), move.value) for move in self.all_moves]
+        # the squares in the same region grouped together (a region is either a row, a column or a block);
+        # the tables are built once per board size and shared between turns
+        self.geometry = board_geometry(self.m, self.n)
+
+        # all legal moves, read from the legality tensor of the board: the moves where
+        #   - the cell the move is going to be made in is empty,
+        #   - the move is not a taboo move, and
+        #   - the value is not already in the same row, column or block
+        move_tensor = MoveTensor(self.geometry, self.squares, game_state.taboo_moves)
+        self.all_moves = [Move(i, j, value) for (i, j, value) in move_tensor.moves()]
+
+        # positions from the opening book are answered without searching; the book does not know
+        # about taboo moves, so it is only used in positions without them
+        book = opening_book()
+        if book is not None and not game_state.taboo_moves:
+            # the book is keyed on the canonical form of the board, its moves are in the canonical frame
+            symmetry = board_symmetry(self.m, self.n)
+            key, transform = symmetry.board_key(self.squares, len(game_state.moves))
+            entry = book.lookup(key)
+            if entry is not None and entry[0] < self.geometry.size:
+                k, value = symmetry.from_canonical((entry[0], entry[1]), transform)
+                # the move must be legal here, in case another position has the same hash
+                if 1 <= value <= self.N \
+                        and move_tensor.legal[self.geometry.cell_row[k], self.geometry.cell_col[k], value - 1]:
+                    self.propose_move(Move(*self.geometry.cell_coordinates[k], value))
+                    return
 
         # propose an initial move before the timer runs out
         if self.squares.count(
                 SudokuBoard.empty) < self.N * self.N:  # if at least one square already filled in; not an empty board
-            least_occurring_coordinate = \
-                sorted([(tup[0], self.all_moves_tuples.count(tup[0])) for tup in self.all_moves_tuples],
-                       key=lambda l: l[-1])[0][0]
-            for (ij, val) in self.all_moves_tuples:
-                if ij[0] == least_occurring_coordinate[0]:
-                    if ij[1] == least_occurring_coordinate[1]:
-                        self.propose_move(Move(ij[0], ij[1], val))
+            # the square with the fewest legal values, counted on the legality tensor
+            least_occurring_coordinate = move_tensor.least_candidates_square()
+            for move in self.all_moves:
+                if (move.i, move.j) == least_occurring_coordinate:
+                    self.propose_move(move)
         else:  # if board empty, play a random move
             self.propose_move(random.choice(self.all_moves))
 
@@ -94,188 +102,45 @@ class SudokuAI(competitive_sudoku.sudokuai.SudokuAI):
         #     self.propose_move(random.choice(all_moves))
 
         # ==========================================================================
-        # Evaluation function that assigns a numerical score to any game state
-
-        def evaluate(game_state: GameState):
-            """ Return numerical evaluation of state 
-                (=difference in points between players)
-            """
-            # the evaluation function depends on the current player; the current player is the maximising player and their opponent is the minimising player
-            if game_state.current_player == 1:
-                return game_state.scores[0] - game_state.scores[1]
-            else:
-                return game_state.scores[1] - game_state.scores[0]
+        # Exact solution of the endgame, when few enough squares are empty
+
+        if self.squares.count(SudokuBoard.empty) <= self.endgame_thresholds.get((self.m, self.n), 0):
+            state = SearchState(game_state, True)
+            state.propagate()
+            # if the solver does not finish in its share of the time, the search below gets the rest
+            result = EndgameSolver(self.time_budget / 2).solve(state)
+            if result is not None:
+                margin, (k, value) = result
+                self.propose_move(Move(*self.geometry.cell_coordinates[k], value))
+                return
 
         # ==========================================================================
-        # Function to obtain all the children states of the current state
-
-        def getChildren(game_state: GameState):
-            """ Returns list of states that follow from state """
-            moves = []
-
-            # dictionary with amount of empty squares per region
-            dct_empty_squares = {}
-            for region in self.dct_regions:
-                values = [game_state.board.get(i, j) for (i, j) in self.dct_regions[region]]
-                empty_squares = values.count(SudokuBoard.empty)
-                dct_empty_squares[region] = empty_squares
-
-                # if there are only 1 square in 1 or more regions, only compare these moves
-                empty_values = np.where(np.array(values) == 0)[0]
-                if len(empty_values) == 1:
-                    ij = self.dct_regions[region][values.index(0)]
-                    for (coordinates, val) in self.all_moves_tuples:
-                        if ij[0] == coordinates[0] and ij[1] == coordinates[1]:
-                                moves.append(Move(ij[0], ij[1], val))
-
-            # dictionary with scores based on how many regions the move completes
-            dct_scores = {0: 0,  # completing 0 regions will give 0 points
-                          1: 1,  # completing 1 region will give 1 points
-                          2: 3,  # completing 2 regions will give 3 points
-                          3: 7}  # completing 3 regions will give 7 points
-
-            # giving each move a score based on how many region it completes
-            lst_scores = []
-            for move in self.all_moves:
-                regions_concerned = [region for region, coordinates in self.dct_regions.items() if
-                                     (move.i, move.j) in coordinates]
-                empty_in_regions = [dct_empty_squares[region] for region in regions_concerned]
-                lst_scores.append(dct_scores[empty_in_regions.count(1)])
-
-            # combine move and evaluation score
-            dct_move_score = dict(zip(self.all_moves_tuples, lst_scores))
-
-            # get the children states
-            if len(moves) > 0:
-                children = []
-                for move in moves:
-                    child_state = copy.deepcopy(game_state)
-                    child_state.board.put(move.i, move.j, move.value)
-                    child_state.taboo_moves.append(move)
-                    child_state.moves.append(move)
-                    if game_state.current_player() == 1:
-                        child_state.scores[0] += dct_move_score[((move.i, move.j), move.value)]
-                    else:
-                        child_state.scores[1] += dct_move_score[((move.i, move.j), move.value)]
-                    children.append(child_state)
-                return children
-            else:
-                children = []
-                for move in self.all_moves:
-                    child_state = copy.deepcopy(game_state)
-                    child_state.board.put(move.i, move.j, move.value)
-                    child_state.taboo_moves.append(move)
-                    child_state.moves.append(move)
-                    if game_state.current_player() == 1:
-                        child_state.scores[0] += dct_move_score[((move.i, move.j), move.value)]
-                    else:
-                        child_state.scores[1] += dct_move_score[((move.i, move.j), move.value)]
-                    children.append(child_state)
-                return children
-
-        # ==========================================================================
-        # Minimax tree search algorithm
-
-        # def minimax(game_state: GameState, depth, alpha, beta, isMaximisingPlayer):
-        #     """ Recursively evaluate nodes in tree """
-        #     if depth==0:
-        #         return evaluate(game_state)
-        #
-        #     bestMove = None
-        #     children = getChildren(game_state)
-        #     for i in range(1, depth):
-        #          value = float("-inf")
-        #          for child in children:
-        #              score = minimax(child, depth, float("-inf"), float("inf"), not isMaximisingPlayer)
-        #              if score > value:
-        #                  value, bestMove = score, child.moves
-        #                  for move in best_state.moves:
-        #                      if move not in game_state.moves:
-        #                          self.propose_move(move)
-        #
-        #
-        #
-        #         children=getChildren(game_state)
-        #         if isMaximisingPlayer:
-        #             value = float("-inf")
-        #             for child in children:
-        #                 # if minimax(child, i-1, alpha, beta, not isMaximisingPlayer) > value:
-        #                 #     best_state = child
-        #                 eval = minimax(child, i-1, alpha, beta, not isMaximisingPlayer)
-        #                 value = max(value, eval)
-        #                 alpha = max(alpha, eval)
-        #                 if beta <= alpha:
-        #                     break
-        #             # for move in best_state.moves:
-        #             #     if move not in game_state.moves:
-        #             #         self.propose_move(move)
-        #             return value
-        #         else:
-        #             value = float("inf")
-        #             for child in children:
-        #                 eval = minimax(child, i-1, alpha, beta, not isMaximisingPlayer)
-        #                 value = min(value, eval)
-        #                 beta = min(beta, eval)
-        #                 if beta <= alpha:
-        #                     break
-        #             return value
-        #
-        #     self.propose_move(bestMove)
-
-        def minimax(game_state: GameState, depth, alpha, beta, isMaximisingPlayer):
-            start_time = time.time()
-            max_seconds = 1
-            max_depth = 72
-
-            def alphaBetaSearch(game_state: GameState, depth, alpha, beta):
-                def maxValue(game_state: GameState, depth, alpha, beta):
-                    val = float("-inf")
-                    children = getChildren(game_state)
-                    for child in children:
-                        val = max(val, alphaBetaSearch(child, depth, alpha, beta))
-                        if val >= beta:
-                            return val
-                        alpha = max(alpha, val)
-                    return val
-
-                def minValue(game_state: GameState, depth, alpha, beta):
-                    val = float("inf")
-                    children = getChildren(game_state)
-                    for child in children:
-                        val = min(val, alphaBetaSearch(child, alpha, beta, depth - 1))
-                        if val <= alpha:
-                            return val
-                        beta = min(beta, val)
-                    return val
-
-                if depth <= 0 or time.time() - start_time > max_seconds:
-                    return evaluate(game_state)
-                return maxValue(game_state, alpha, beta, depth) if isMaximisingPlayer else minValue(game_state, alpha,
-                                                                                                    beta,
-                                                                                                    depth)
-
-            bestMove = None
-            for depth in range(1, max_depth):
-                if time.time() - start_time > max_seconds:
-                    break
-                val = float("-inf")
-                children = getChildren(game_state)
-                for child in children:
-                    score = alphaBetaSearch(child, float("-inf"), float("inf"), depth)
-                    if score > val:
-                        val, bestMove = score, child.moves
-                        best_state = child
-
-                for move in best_state.moves:
-                    if move not in game_state.moves:
-                        self.propose_move(move)
-            # self.propose_move(bestMove)
-            return bestMove
-
-        depth = self.squares.count(SudokuBoard.empty)  # amount of empty squares
-        isMaximisingPlayer = True
-
-        minimax(game_state, depth, float("-inf"), float("inf"), isMaximisingPlayer)
+        # Iterative deepening alpha-beta search or Monte Carlo Tree Search, walked on a single mutable search state
+
+        def propose(i, j, value):
+            self.propose_move(Move(i, j, value))
+
+        seconds = max(0.0, self.time_budget - (time.perf_counter() - start_time))
+
+        engine = self.engines.get((self.m, self.n), self.engine)
+        if engine == "mcts":
+            MonteCarloTreeSearch(propose, max_seconds=seconds).search(game_state)
+        elif self.workers > 1:
+            ParallelRootSearch(propose, max_seconds=seconds, workers=self.workers,
+                               pipeline=self.pipeline).minimax(game_state)
+        else:
+            trace = SearchTrace(self.trace_file) if self.trace_file else None
+            search = AlphaBetaSearch(propose, max_seconds=seconds, pipeline=move_pipeline(self.pipeline),
+                                     trace=trace)
+            # canonical keys merge the many symmetric positions of a nearly empty board; later in the game they
+            # cost more time than they save (see symmetry_benchmark.py)
+            filled = 1 - self.squares.count(SudokuBoard.empty) / len(self.squares)
+            search.canonical_keys = filled < self.canonical_keys_fill
+            if self.persistent:
+                memory = SearchMemory(self, self.memory_file)
+                search.memory = memory.load()
+                search.save_snapshot = memory.save
+            search.minimax(game_state)
 
 # python simulate_game.py --first team05_A1_v2 --board "boards/empty-3x3.txt"
 # python simulate_game.py --first team05_A1_v2 --second greedy_player --board "boards/empty-3x3.txt"
@@ -0,0 +1,127 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Canonical hashing of positions under the symmetries of the board.
+#
+# Permuting the rows within a band (the m rows of a row of blocks), the bands,
+# the columns within a stack, the stacks, and transposing a board with square
+# blocks all map regions to regions, so they do not change the game: the
+# positions they produce have the same value and corresponding best moves.
+#
+# The canonical form orders the rows of every band by the mask of the values
+# used in the row (which does not change when columns are permuted), then the
+# bands by the masks of their rows, and the columns and stacks in the same way
+# with the column masks. With square blocks the transposed board is ordered as
+# well and the smaller of the two hashes is used. The masks are the row_used /
+# col_used masks the candidate engine keeps up to date, so only the sorting and
+# the hash of the permuted board are computed per position.
+#
+# Rows with equal masks keep their order, so not every pair of equivalent
+# positions gets the same key. The keys are always safe, though: positions
+# only share a key when one is a symmetry of the other (up to hash
+# collisions). The taboo moves are hashed with the board, since a taboo move
+# in one position is not taboo in its symmetric counterpart.
+#
+# Moves are stored in the canonical frame; to_canonical() / from_canonical()
+# translate them with the transform returned by canonical().
+
+import random
+
+from .geometry import BoardGeometry, board_geometry
+from .zobrist import zobrist_keys
+
+
+class Symmetry(object):
+    """
+    Canonical Zobrist keys and move translation for a board shape.
+    """
+
+    def __init__(self, geometry: BoardGeometry):
+        m, n, N = geometry.m, geometry.n, geometry.N
+        self.geometry = geometry
+        self.N = N
+        self.zobrist = zobrist_keys(geometry)
+        generator = random.Random(f"taboo-{m}x{n}")
+        # taboo_key[k * (N + 1) + value]: key of the taboo move (k, value)
+        self.taboo_key = [generator.getrandbits(64) for _ in range(geometry.size * (N + 1))]
+        self.bands = [tuple(range(band * m, (band + 1) * m)) for band in range(n)]
+        self.stacks = [tuple(range(stack * n, (stack + 1) * n)) for stack in range(m)]
+        self.transpose = m == n
+
+    def positions(self, masks, groups) -> list:
+        """ Returns the canonical index of every row (or column), given the masks of the lines and their groups """
+        ordered = []
+        for group in groups:
+            lines = sorted(group, key=masks.__getitem__)
+            ordered.append((tuple(masks[line] for line in lines), lines))
+        ordered.sort(key=lambda item: item[0])
+        position = [0] * self.N
+        index = 0
+        for (_, lines) in ordered:
+            for line in lines:
+                position[line] = index
+                index += 1
+        return position
+
+    def canonical(self, squares, row_used, col_used, ply: int, taboo=()):
+        """ Returns (key, transform): the canonical hash of the position and the transform to the canonical frame;
+            taboo holds the taboo moves as (k, value) pairs
+        """
+        N = self.N
+        row_position = self.positions(row_used, self.bands)
+        column_position = self.positions(col_used, self.stacks)
+        stride, cell_value, taboo_key = N + 1, self.zobrist.cell_value, self.taboo_key
+        key = transposed_key = self.zobrist.side_key if ply % 2 else 0
+        for k, value in enumerate(squares):
+            if value:
+                row, column = row_position[k // N], column_position[k % N]
+                key ^= cell_value[(row * N + column) * stride + value]
+                transposed_key ^= cell_value[(column * N + row) * stride + value]
+        for (k, value) in taboo:
+            row, column = row_position[k // N], column_position[k % N]
+            key ^= taboo_key[(row * N + column) * stride + value]
+            transposed_key ^= taboo_key[(column * N + row) * stride + value]
+        if self.transpose and transposed_key < key:
+            return transposed_key, (row_position, column_position, True)
+        return key, (row_position, column_position, False)
+
+    def board_key(self, squares, ply: int, taboo=()):
+        """ Returns canonical() of a board given as a list of squares """
+        N = self.N
+        row_used, col_used = [0] * N, [0] * N
+        for k, value in enumerate(squares):
+            if value:
+                row_used[k // N] |= 1 << (value - 1)
+                col_used[k % N] |= 1 << (value - 1)
+        return self.canonical(squares, row_used, col_used, ply, taboo)
+
+    def to_canonical(self, move, transform):
+        """ Returns move (k, value) in the canonical frame of transform """
+        k, value = move
+        row_position, column_position, transposed = transform
+        row, column = row_position[k // self.N], column_position[k % self.N]
+        if transposed:
+            row, column = column, row
+        return row * self.N + column, value
+
+    def from_canonical(self, move, transform):
+        """ Returns the move (k, value) of the canonical frame of transform in the original frame """
+        k, value = move
+        row_position, column_position, transposed = transform
+        row, column = divmod(k, self.N)
+        if transposed:
+            row, column = column, row
+        return row_position.index(row) * self.N + column_position.index(column), value
+
+
+# module level cache: (m, n) -> Symmetry
+_symmetries = {}
+
+
+def board_symmetry(m: int, n: int) -> Symmetry:
+    """ Returns the (cached) symmetry tables of a board shape """
+    symmetry = _symmetries.get((m, n))
+    if symmetry is None:
+        symmetry = _symmetries[(m, n)] = Symmetry(board_geometry(m, n))
+    return symmetry
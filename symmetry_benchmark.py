@@ -0,0 +1,77 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Measurement of the canonical transposition table keys (see symmetry.py).
+#
+# Plays self-play games of AlphaBetaSearch from the same starting positions,
+# once with the plain Zobrist keys and once with the canonical keys, and
+# reports per board shape the transposition table hit rate, nodes/sec and the
+# average depth reached per move. A game ends when the search finds no move
+# (no legal move is left, or propagation shows the board has no solution).
+#
+# Run it from the directory with simulate_game.py, with this team folder as a package:
+#   python -m team05_A1_v2.symmetry_benchmark --seconds 0.5 --games 3
+
+import argparse
+import time
+
+from competitive_sudoku.sudoku import Move
+from .positions import random_position
+from .search import AlphaBetaSearch
+from .search_state import SearchState
+
+SHAPES = [(2, 2), (2, 3), (3, 3)]
+
+
+def play(m: int, n: int, fill: float, seed: int, seconds: float, canonical_keys: bool) -> dict:
+    """ Plays a self-play game and returns the totals of its searches """
+    game_state = random_position(m, n, fill, seed)
+    totals = {"moves": 0, "probes": 0, "hits": 0, "nodes": 0, "seconds": 0.0, "depth": 0}
+    while True:
+        search = AlphaBetaSearch(lambda i, j, value: None, seconds)
+        search.canonical_keys = canonical_keys
+        start = time.perf_counter()
+        best_move = search.minimax(game_state)
+        if best_move is None:
+            break
+        totals["seconds"] += time.perf_counter() - start
+        stats = search.tt.stats()
+        totals["moves"] += 1
+        totals["probes"] += stats["probes"]
+        totals["hits"] += stats["hits"]
+        totals["nodes"] += search.nodes
+        totals["depth"] += search.depth
+
+        k, value = best_move
+        state = SearchState(game_state)
+        i, j = state.geometry.cell_coordinates[k]
+        game_state.scores[state.ply % 2] += state.points(k)
+        game_state.board.put(i, j, value)
+        game_state.moves.append(Move(i, j, value))
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transposition table hit rates with and without canonical keys")
+    parser.add_argument("--seconds", type=float, default=0.5, help="time budget per move")
+    parser.add_argument("--games", type=int, default=3, help="games per board shape and key type")
+    parser.add_argument("--fill", type=float, default=0.0, help="filled fraction of the starting positions")
+    args = parser.parse_args()
+
+    print(f"{'shape':>5} {'keys':>9} {'moves':>5} {'hit rate':>8} {'nodes/sec':>9} {'depth':>5}")
+    for (m, n) in SHAPES:
+        for canonical_keys in (False, True):
+            totals = {}
+            for seed in range(args.games):
+                for name, value in play(m, n, args.fill, seed, args.seconds, canonical_keys).items():
+                    totals[name] = totals.get(name, 0) + value
+            hit_rate = totals["hits"] / totals["probes"] if totals["probes"] else 0.0
+            nodes_per_second = totals["nodes"] / totals["seconds"] if totals["seconds"] else 0.0
+            depth = totals["depth"] / totals["moves"] if totals["moves"] else 0.0
+            print(f"{f'{m}x{n}':>5} {'canonical' if canonical_keys else 'zobrist':>9} {totals['moves']:>5} "
+                  f"{hit_rate:>8.3f} {nodes_per_second:>9.0f} {depth:>5.1f}")
+
+
+if __name__ == "__main__":
+    main()
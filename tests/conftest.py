@@ -0,0 +1,14 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The tests use the competitive_sudoku framework when it can be imported (in
+# the folder of simulate_game.py); otherwise the copy of the part of its
+# interface this team folder uses, in tests/framework.
+
+import importlib.util
+import os
+import sys
+
+if importlib.util.find_spec("competitive_sudoku") is None:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "framework"))
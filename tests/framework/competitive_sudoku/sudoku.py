@@ -0,0 +1,104 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The part of competitive_sudoku.sudoku of the framework that this team folder
+# uses, so the tests also run where the framework is not installed.
+
+
+class Move(object):
+    """A Move is a tuple (i, j, value) that represents the action board.put(i, j, value) for a given
+    sudoku configuration board."""
+
+    def __init__(self, i: int, j: int, value: int):
+        self.i = i
+        self.j = j
+        self.value = value
+
+    def __str__(self):
+        return f'({self.i},{self.j}) -> {self.value}'
+
+    def __eq__(self, other):
+        return (self.i, self.j, self.value) == (other.i, other.j, other.value)
+
+
+class TabooMove(Move):
+    """A TabooMove is a Move that was flagged as illegal by the sudoku oracle. In other words, the execution of such a
+    move would cause the sudoku to become unsolvable."""
+
+
+class SudokuBoard(object):
+    """
+    A simple board class for Sudoku. It supports arbitrary rectangular regions.
+    """
+
+    empty = 0  # Empty cells are stored with the value 0
+
+    def __init__(self, m: int = 3, n: int = 3):
+        """
+        @param m: The number of rows in a region.
+        @param n: The number of columns in a region.
+        """
+        N = m * n
+        self.m = m
+        self.n = n
+        self.N = N
+        self.squares = [SudokuBoard.empty] * (N * N)
+
+    def rc2f(self, i: int, j: int):
+        return i * self.N + j
+
+    def f2rc(self, k: int):
+        return k // self.N, k % self.N
+
+    def put(self, i: int, j: int, value: int) -> None:
+        self.squares[self.rc2f(i, j)] = value
+
+    def get(self, i: int, j: int):
+        return self.squares[self.rc2f(i, j)]
+
+    def region_width(self):
+        return self.n
+
+    def region_height(self):
+        return self.m
+
+    def board_width(self):
+        return self.N
+
+    def board_height(self):
+        return self.N
+
+
+def load_sudoku_from_text(text: str) -> SudokuBoard:
+    """
+    Loads a sudoku board from a string: the region sizes m and n, followed by the N * N squares (. for empty).
+    """
+    words = text.split()
+    m, n = int(words[0]), int(words[1])
+    board = SudokuBoard(m, n)
+    N = board.N
+    for k in range(N * N):
+        word = words[2 + k]
+        board.squares[k] = SudokuBoard.empty if word == '.' else int(word)
+    return board
+
+
+class GameState(object):
+    def __init__(self, initial_board: SudokuBoard, board: SudokuBoard, taboo_moves, moves, scores):
+        """
+        @param initial_board: A sudoku board. It contains the start position of a game.
+        @param board: A sudoku board. It contains the current position of a game.
+        @param taboo_moves: A list of taboo moves. Moves in this list cannot be played.
+        @param moves: The history of a sudoku game, starting in initial_board.
+        @param scores: The current scores of the first and the second player.
+        """
+        self.initial_board = initial_board
+        self.board = board
+        self.taboo_moves = taboo_moves
+        self.moves = moves
+        self.scores = scores
+
+    def current_player(self):
+        """Gives the index of the current player (1 or 2)."""
+        return 2 if len(self.moves) % 2 else 1
@@ -0,0 +1,44 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The endgame solver must find the exact final margin, compared with a plain
+# negamax over all legal moves.
+
+import pytest
+
+from ..endgame import EndgameSolver
+from ..positions import random_position
+from ..search_state import SearchState
+
+
+def negamax(state: SearchState) -> int:
+    """ Returns the points the player to move gains over the opponent until the end of the game """
+    value = None
+    for (k, number) in state.legal_moves():
+        points = state.points(k)
+        state.apply((k, number))
+        score = points - negamax(state)
+        state.undo()
+        if value is None or score > value:
+            value = score
+    return 0 if value is None else value
+
+
+@pytest.mark.parametrize("m, n, empty", [(2, 2, 6), (2, 2, 8), (2, 3, 7), (3, 3, 8)])
+def test_solver_matches_negamax(m, n, empty):
+    size = (m * n) ** 2
+    for seed in range(4):
+        game_state = random_position(m, n, (size - empty) / size, seed)
+        game_state.scores = [seed, 1]
+        game_state.moves = [None] * seed
+        state = SearchState(game_state)
+        margin, move = EndgameSolver(60).solve(state)
+        player = state.ply % 2
+        lead = state.scores[player] - state.scores[1 - player]
+        assert margin == lead + negamax(state)
+        # the move of the solver reaches that margin
+        points = state.points(move[0])
+        state.apply(move)
+        assert margin == lead + points - negamax(state)
+        state.undo()
@@ -0,0 +1,62 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The results of the playouts are added to the tree from the point of view of
+# the player who made the move into each node, whichever player is to move at
+# the root.
+
+import random
+
+import pytest
+
+from competitive_sudoku.sudoku import GameState, Move, SudokuBoard
+
+from ..mcts import MonteCarloTreeSearch
+from ..positions import random_solution
+from ..search_state import SearchState
+
+
+def position(empty, ply: int, scores) -> GameState:
+    """ Returns a solved 2x2 board with the given squares empty, after ply moves """
+    board = SudokuBoard(2, 2)
+    board.squares = random_solution(2, 2, random.Random(1))
+    for k in empty:
+        board.squares[k] = SudokuBoard.empty
+    moves = [Move(3, 3, board.squares[15])] * ply
+    return GameState(SudokuBoard(2, 2), board, [], moves, list(scores))
+
+
+def depth(search: MonteCarloTreeSearch, node: int) -> int:
+    result = 0
+    while search.parent[node] >= 0:
+        node, result = search.parent[node], result + 1
+    return result
+
+
+@pytest.mark.parametrize("ply", [0, 1])
+@pytest.mark.parametrize("lead, won", [(0, 1.0), (-10, 0.0)])
+def test_last_move(ply, lead, won):
+    # the only move completes three regions; the player to move wins unless the opponent leads by more
+    scores = [lead, 0] if ply % 2 == 0 else [0, lead]
+    search = MonteCarloTreeSearch(lambda *move: None, 1.0, seed=1)
+    search.add_node(-1, -1)
+    search.iterate(SearchState(position([0], ply, scores)))
+    assert search.child_count[0] == 1
+    assert search.visits[1] == 1 and search.wins[1] == won
+    assert search.visits[0] == 1 and search.wins[0] == 1.0 - won
+
+
+@pytest.mark.parametrize("ply", [0, 1])
+def test_second_mover_wins(ply):
+    # two empty squares in row 0, in different columns and blocks: the first move completes a column and a
+    # block, the second one also the row, so the player to move at the root always loses
+    state = SearchState(position([0, 2], ply, [0, 0]))
+    search = MonteCarloTreeSearch(lambda *move: None, 1.0, seed=1)
+    search.add_node(-1, -1)
+    for _ in range(20):
+        search.iterate(state)
+    assert len(search.move) == 5  # the root, its two children and one grandchild each
+    for node in range(len(search.move)):
+        assert search.visits[node] > 0
+        assert search.wins[node] == (search.visits[node] if depth(search, node) % 2 == 0 else 0.0)
@@ -0,0 +1,86 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Killer moves, the history table and the order of the moves: table move,
+# scoring moves by their points, killers, then the quiet moves by history.
+
+from ..move_ordering import MoveOrdering
+from ..positions import random_position
+from ..search_state import SearchState
+
+
+class CountingState(SearchState):
+    """ Counts the calls of legal_moves() """
+    __slots__ = ("calls",)
+
+    def __init__(self, game_state):
+        self.calls = 0
+        super().__init__(game_state)
+
+    def legal_moves(self) -> list:
+        self.calls += 1
+        return super().legal_moves()
+
+
+def position(state_class=SearchState):
+    """ Returns a state with scoring moves and at least four quiet moves """
+    for seed in range(100):
+        state = state_class(random_position(3, 3, 0.6, seed))
+        moves = state.legal_moves()
+        quiet = [move for move in moves if not state.points(move[0])]
+        if len(quiet) >= 4 and len(quiet) < len(moves):
+            return state, moves, quiet
+
+
+def test_cutoffs_make_killers_and_history():
+    state, moves, quiet = position()
+    scoring = [move for move in moves if state.points(move[0])]
+    ordering = MoveOrdering(killers_per_ply=2)
+    ordering.cutoff(state, scoring[0], 1, 3)
+    assert ordering.killer_moves(1) == [] and ordering.history == {}  # scoring moves are ordered first anyway
+    for move in quiet[:3]:
+        ordering.cutoff(state, move, 1, 3)
+    assert ordering.killer_moves(1) == [quiet[2], quiet[1]]  # most recent first, at most killers_per_ply
+    assert ordering.killer_moves(0) == []
+    ordering.cutoff(state, quiet[0], 1, 2)
+    assert ordering.history[quiet[0]] == 3 * 3 + 2 * 2
+    assert ordering.history[quiet[1]] == 3 * 3
+
+
+def test_order_and_staged_agree():
+    state, moves, quiet = position()
+    ordering = MoveOrdering()
+    ordering.cutoff(state, quiet[0], 0, 2)  # history only, the killer is replaced below
+    ordering.cutoff(state, quiet[1], 0, 1)
+    ordering.killers[0] = [quiet[2]]
+    best_move = quiet[-1]
+
+    ordered = ordering.order(state, moves, best_move, 0)
+    points = [state.points(move[0]) for move in ordered[1:]]
+    assert ordered[0] == best_move
+    scoring = len([move for move in moves if state.points(move[0])])
+    assert points[:scoring] == sorted(points[:scoring], reverse=True) and all(points[:scoring])
+    assert ordered[1 + scoring] == quiet[2]
+    assert ordered[2 + scoring:4 + scoring] == [quiet[0], quiet[1]]
+
+    staged = list(ordering.staged(state, moves, best_move, 0))
+    assert sorted(staged) == sorted(move for move in moves if move != best_move)
+    assert staged == ordered[1:]
+
+
+def test_staged_generates_the_legal_moves_last():
+    state, moves, quiet = position(CountingState)
+    ordering = MoveOrdering()
+    ordering.cutoff(state, quiet[0], 0, 2)
+    ordering.killers[0] = [quiet[1], (quiet[1][0], quiet[1][1] % state.geometry.N + 1)]  # one may be illegal
+    assert list(ordering.staged(state, None, quiet[-1], 0)) == list(ordering.staged(state, moves, quiet[-1], 0))
+
+    state.calls = 0
+    staged = ordering.staged(state, None, None, 0)
+    scoring = len([move for move in moves if state.points(move[0])])
+    for _ in range(scoring + 1):  # the scoring moves and the legal killer
+        next(staged)
+    assert state.calls == 0
+    next(staged)
+    assert state.calls == 1
@@ -0,0 +1,41 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The pipeline configurations generate the right moves and count what their
+# stages do; the stages that are inactive in the phase of the game are skipped.
+
+from ..move_pipeline import FillRegionStage, MovePipeline, PropagationStage, move_pipeline
+from ..positions import random_position
+from ..search import AlphaBetaSearch
+from ..search_state import SearchState
+
+
+def scoring_position():
+    """ Returns a state with moves that complete a region and moves that do not """
+    for seed in range(100):
+        state = SearchState(random_position(3, 3, 0.6, seed))
+        if state.scoring_moves() and len(state.scoring_moves()) < len(state.legal_moves()):
+            return state
+
+
+def test_moves_of_the_configurations():
+    state = scoring_position()
+    assert move_pipeline("unfiltered").moves(state) is None  # all legal moves, generated by the move ordering
+    assert move_pipeline("fill_region").moves(state) == state.scoring_moves()
+    stage = FillRegionStage()
+    MovePipeline([stage]).moves(state)
+    assert stage.stats()["calls"] == 1
+    assert stage.stats()["removed"] == state.empty_count() - len({k for (k, value) in state.scoring_moves()})
+
+
+def test_stats_count_the_active_stages():
+    pipeline = MovePipeline([PropagationStage(min_depth=1), FillRegionStage(min_fill=0.9)])
+    search = AlphaBetaSearch(lambda *move: None, 1e9, pipeline=pipeline)
+    state = SearchState(random_position(3, 3, 0.3, 1), search.propagation)
+    search.start(state)
+    search.alpha_beta(state, 2, float("-inf"), float("inf"))
+    stats = pipeline.stats()
+    assert stats["propagation"]["active"] and stats["propagation"]["calls"] > 1
+    assert stats["propagation"]["seconds"] > 0.0
+    assert not stats["fill_region"]["active"] and stats["fill_region"]["calls"] == 0
@@ -0,0 +1,49 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The legality tensor must give the legal moves of the candidate engine, with
+# taboo moves masked out, and a stack of boards the same tensors as separate
+# calls.
+
+import numpy as np
+import pytest
+
+from competitive_sudoku.sudoku import TabooMove
+from ..geometry import board_geometry
+from ..move_tensor import MoveTensor, legality_tensor, taboo_tensor
+from ..positions import random_position
+from ..search_state import SearchState
+
+
+@pytest.mark.parametrize("m, n", [(2, 2), (2, 3), (3, 2), (3, 3), (3, 4)])
+def test_moves_match_the_candidate_engine(m, n):
+    geometry = board_geometry(m, n)
+    for seed in range(4):
+        game_state = random_position(m, n, 0.4, seed)
+        empty = [k for (k, value) in enumerate(game_state.board.squares) if not value]
+        game_state.taboo_moves = [TabooMove(*geometry.cell_coordinates[k], 1 + k % geometry.N) for k in empty[:3]]
+        tensor = MoveTensor(geometry, game_state.board.squares, game_state.taboo_moves)
+        state = SearchState(game_state)
+        moves = sorted((geometry.index(i, j), value) for (i, j, value) in tensor.moves())
+        assert moves == sorted(state.legal_moves())
+        counts = tensor.candidate_counts()
+        for k in range(geometry.size):
+            assert counts[geometry.cell_coordinates[k]] == bin(state.candidates.candidates(k)).count("1")
+
+
+@pytest.mark.parametrize("m, n", [(2, 2), (2, 3), (3, 3)])
+def test_stack_matches_separate_calls(m, n):
+    N = m * n
+    positions = [random_position(m, n, fill, seed) for fill in (0.1, 0.5, 0.8) for seed in range(2)]
+    boards = np.array([position.board.squares for position in positions]).reshape(3, 2, N, N)
+    taboo = np.zeros((3, 2, N, N, N), dtype=bool)
+    taboo[1, 0] = taboo_tensor([TabooMove(0, 0, 1), TabooMove(N - 1, 1, 2)], N)
+
+    stacked = legality_tensor(boards, m, n, taboo)
+    assert stacked.shape == (3, 2, N, N, N)
+    for index in np.ndindex(3, 2):
+        assert np.array_equal(stacked[index], legality_tensor(boards[index], m, n, taboo[index]))
+    # a taboo tensor of one position broadcasts over the stack
+    single = taboo[1, 0]
+    assert np.array_equal(legality_tensor(boards, m, n, single)[0, 1], legality_tensor(boards[0, 1], m, n, single))
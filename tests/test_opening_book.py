@@ -0,0 +1,60 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Lookups in the memory-mapped opening book, and the canonical keys that let
+# one entry answer symmetric positions.
+
+import random
+
+import pytest
+
+from ..build_book import search_position
+from ..opening_book import OpeningBook, opening_book, write_book
+from ..positions import random_position
+from ..search_state import SearchState
+from ..symmetry import board_symmetry
+
+
+def test_lookup(tmp_path):
+    path = str(tmp_path / "book.bin")
+    generator = random.Random(1)
+    entries = {generator.getrandbits(64): (k, 1 + k % 9, 4, k - 50) for k in range(100)}
+    entries[12345] = (3, 2, 300, -40000)  # depth and score are clamped to their fields
+    write_book(path, entries)
+    book = OpeningBook(path)
+    assert len(book) == len(entries)
+    for (key, entry) in entries.items():
+        if key != 12345:
+            assert book.lookup(key) == entry
+    assert book.lookup(12345) == (3, 2, 255, -32768)
+    assert book.lookup(0) is None and book.lookup((1 << 64) - 1) is None and book.lookup(12346) is None
+    assert len(book.entries()) == len(entries)
+    book.close()
+
+
+def test_unusable_files(tmp_path):
+    path = tmp_path / "book.bin"
+    path.write_bytes(b"no book")
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
+    assert opening_book(str(tmp_path / "missing.bin")) is None
+
+
+def test_entry_answers_the_transposed_position(tmp_path):
+    game_state = random_position(3, 3, 0.3, 1)
+    key, entry = search_position(game_state, 0.2)
+    path = str(tmp_path / "book.bin")
+    write_book(path, {key: entry})
+    book = OpeningBook(path)
+
+    # the same position with rows and columns swapped
+    N = 9
+    squares = game_state.board.squares
+    game_state.board.squares = [squares[(k % N) * N + k // N] for k in range(N * N)]
+    state = SearchState(game_state)
+    symmetry = board_symmetry(3, 3)
+    key, transform = symmetry.board_key(state.squares, state.ply)
+    cell, value, depth, score = book.lookup(key)
+    assert state.is_legal(symmetry.from_canonical((cell, value), transform))
+    book.close()
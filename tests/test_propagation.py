@@ -0,0 +1,50 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The propagator may only remove candidates that are not part of any solution:
+# every removed (square, value) pair is checked with a backtracking solver that
+# only uses the sudoku rules.
+
+import pytest
+
+from ..candidates import CandidateEngine, mask_values
+from ..positions import random_position
+from ..search_state import SearchState
+
+
+def solvable(candidates: CandidateEngine) -> bool:
+    """ Returns whether the empty squares can be filled in, ignoring the taboo masks """
+    geometry = candidates.geometry
+    best = None
+    for k, value in enumerate(candidates.squares):
+        if not value:
+            mask = ~(candidates.row_used[geometry.cell_row[k]] | candidates.col_used[geometry.cell_col[k]]
+                     | candidates.block_used[geometry.cell_block[k]]) & candidates.full
+            if best is None or bin(mask).count("1") < bin(best[1]).count("1"):
+                best = (k, mask)
+    if best is None:
+        return True
+    k, mask = best
+    for value in mask_values(mask):
+        candidates.place(k, value)
+        solved = solvable(candidates)
+        candidates.remove(k)
+        if solved:
+            return True
+    return False
+
+
+@pytest.mark.parametrize("m, n, fill", [(2, 2, 0.2), (2, 2, 0.4), (2, 3, 0.3), (2, 3, 0.5), (3, 3, 0.45),
+                                        (3, 3, 0.6)])
+def test_removed_candidates_have_no_solution(m, n, fill):
+    for seed in range(4):
+        state = SearchState(random_position(m, n, fill, seed), True)
+        before = list(state.candidates.taboo)
+        assert state.propagate()
+        removed = [(k, value) for k, mask in enumerate(state.candidates.taboo)
+                   for value in mask_values(mask & ~before[k])]
+        for (k, value) in removed:
+            state.candidates.place(k, value)
+            assert not solvable(state.candidates), (seed, k, value)
+            state.candidates.remove(k)
@@ -0,0 +1,51 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The root moves are proposed while a depth is searched: every proposal must
+# be a move that is better than the move proposed before it, the last one is
+# the best move of the depth, and a depth that runs out of time only leaves
+# its proposals behind.
+
+import pytest
+
+from ..positions import random_position
+from ..search import AlphaBetaSearch
+from ..search_state import SearchState
+
+
+# positions where the root moves do not all have the same value
+@pytest.mark.parametrize("m, n, fill, seed, depth", [(2, 2, 0.3, 1, 3), (2, 3, 0.3, 2, 2), (3, 3, 0.7, 2, 2)])
+def test_proposals_improve_during_a_depth(m, n, fill, seed, depth):
+    game_state = random_position(m, n, fill, seed)
+    reference = AlphaBetaSearch(lambda i, j, value: None, 1e9)
+    state = SearchState(game_state, reference.propagation)
+    reference.start(state)
+    values = {}
+    for move in reference.getChildren(state):
+        state.apply(move)
+        values[move] = reference.alpha_beta(state, depth - 1, float("-inf"), float("inf"))
+        state.undo()
+
+    # the worst move was the best one of the previous depth and is searched first
+    proposals = []
+    search = AlphaBetaSearch(lambda i, j, value: proposals.append((i * state.geometry.N + j, value)), 1e9)
+    search.start(state)
+    moves = sorted(values, key=values.get)
+    search.best_move = moves[0]
+    value, best_move = search.search_root(state, moves, depth, float("-inf"), float("inf"))
+    assert value == max(values.values()) > values[moves[0]] and values[best_move] == value
+    assert proposals[-1] == best_move
+    proposed = [values[moves[0]]] + [values[move] for move in proposals]
+    assert all(before < after for (before, after) in zip(proposed, proposed[1:]))
+
+
+def test_a_depth_that_runs_out_of_time_is_not_recorded():
+    # the deadline has passed before the search starts, so the first depth stops after 64 nodes
+    proposals, snapshots = [], []
+    search = AlphaBetaSearch(lambda i, j, value: proposals.append((i, j, value)), 0.0)
+    search.clock.check_interval = 64
+    search.save_snapshot = snapshots.append
+    best_move = search.minimax(random_position(3, 3, 0.3, 3))
+    assert best_move is not None and proposals  # the root moves searched so far are still proposed
+    assert search.depth == 0 and search.depth_move is None and not snapshots
@@ -0,0 +1,60 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The alpha-beta search (with its transposition table, null windows, frontier
+# batches and canonical keys) must give the same value as a plain minimax over
+# the same children, with the quiescence search over all scoring moves at the
+# horizon.
+
+import pytest
+
+from ..positions import random_position
+from ..search import AlphaBetaSearch
+from ..search_state import SearchState
+
+
+def quiescence(search: AlphaBetaSearch, state: SearchState):
+    """ Returns the minimax value of the scoring moves, where the player to move may also stop """
+    values = [search.evaluate(state)]
+    for move in state.scoring_moves():
+        state.apply(move)
+        values.append(quiescence(search, state))
+        state.undo()
+    return max(values) if state.ply % 2 == search.root_player else min(values)
+
+
+def minimax(search: AlphaBetaSearch, state: SearchState, depth: int):
+    """ Returns the plain minimax value of state """
+    if depth == 0:
+        return quiescence(search, state)
+    values = []
+    for move in list(search.getChildren(state)):
+        state.apply(move)
+        values.append(minimax(search, state, depth - 1))
+        state.undo()
+    if not values:
+        return search.evaluate(state)
+    return max(values) if state.ply % 2 == search.root_player else min(values)
+
+
+@pytest.mark.parametrize("settings", [{}, {"parity_weight": 1}, {"canonical_keys": True},
+                                      {"batch_frontier": False}])
+@pytest.mark.parametrize("m, n, fill", [(2, 2, 0.3), (2, 3, 0.6)])
+def test_alpha_beta_matches_minimax(m, n, fill, settings):
+    for seed in range(3):
+        game_state = random_position(m, n, fill, seed)
+        game_state.moves = [None] * seed
+        game_state.scores = [seed, 0]
+        for depth in (1, 2, 3):
+            search = AlphaBetaSearch(lambda i, j, value: None, 1e9)
+            search.quiescence_budget = 10 ** 9
+            search.frontier_min_empty = 0
+            for (name, value) in settings.items():
+                setattr(search, name, value)
+            state = SearchState(game_state, search.propagation)
+            search.start(state)
+            expected = minimax(search, state, depth)
+            assert search.alpha_beta(state, depth, float("-inf"), float("inf")) == expected, (seed, depth)
+            # the second search gets its values from the transposition table
+            assert search.alpha_beta(state, depth, float("-inf"), float("inf")) == expected, (seed, depth)
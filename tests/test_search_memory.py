@@ -0,0 +1,67 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The search memory survives a round trip through its file, holds the table
+# entries along the principal variation, and a search without a usable memory
+# (no player_number in the framework, an unwritable or corrupt file) still
+# plays its move.
+
+import pickle
+
+from ..positions import random_position
+from ..search import AlphaBetaSearch
+from ..search_memory import SearchMemory
+from ..search_state import SearchState
+from ..sudokuai import SudokuAI
+
+
+def test_round_trip_and_continuation(tmp_path):
+    game_state = random_position(3, 3, 0.5, 1)
+    memory = SearchMemory(None, str(tmp_path / "memory.pkl"))
+    snapshots = []
+    search = AlphaBetaSearch(lambda i, j, value: None, 1.0)
+    search.save_snapshot = lambda snapshot: snapshots.append(snapshot) or memory.save(snapshot)
+    search.minimax(game_state)
+    snapshot = snapshots[-1]
+    assert memory.load() == snapshot
+
+    # the entries of the positions along the principal variation are kept, and only a part of the table
+    pv = snapshot["pv"]
+    assert len(pv) >= 3
+    keys = {entry[0] for entry in snapshot["tt"]}
+    state = SearchState(game_state)
+    for move in pv[:-1]:  # the table move of each position is the next move of the variation
+        state.apply(move)
+        assert state.hash in keys
+    for _ in pv[:-1]:
+        state.undo()
+    assert len(snapshot["tt"]) < sum(entry is not None for entry in search.tt.slots)
+
+    # the search two plies later continues from it: table entries and the next move of the variation
+    for move in pv[:2]:
+        state.apply(move)
+    later = AlphaBetaSearch(lambda i, j, value: None, 1e9)
+    next_state = SearchState.from_snapshot(state.snapshot(), later.propagation)
+    later.start(next_state)
+    assert later.restore(memory.load(), next_state)
+    assert later.first_move == pv[2]
+    assert later.probe(next_state) is not None
+
+
+def test_runs_without_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    game_state = random_position(3, 3, 0.5, 2)
+    ai = SudokuAI()  # the framework of the tests has no player_number and no save() / load()
+    ai.time_budget = 0.3
+    ai.compute_best_move(game_state)
+    assert (tmp_path / "search_memory_1.pkl").exists()
+    assert ai.best_move != [0, 0, 0]
+
+    # a corrupt file is ignored, a file that cannot be written is skipped
+    (tmp_path / "search_memory_1.pkl").write_bytes(pickle.dumps({"tt": []})[:5])
+    assert SearchMemory(ai).load() is None
+    ai.compute_best_move(game_state)
+    ai.memory_file = str(tmp_path / "missing" / "memory.pkl")
+    ai.compute_best_move(game_state)
+    assert SearchMemory(ai, ai.memory_file).load() is None
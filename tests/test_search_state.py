@@ -0,0 +1,41 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# apply() followed by undo() must restore every field of the search state,
+# with and without propagation.
+
+import random
+
+import pytest
+
+from ..positions import random_position
+from ..search_state import SearchState
+
+
+def fields(state: SearchState) -> tuple:
+    """ Returns the contents of the state that apply() and undo() change """
+    candidates = state.candidates
+    return (bytes(state.squares), list(candidates.row_used), list(candidates.col_used), list(candidates.block_used),
+            list(candidates.taboo), list(state.scores), state.ply, state.history, list(state.empty_in_region),
+            state.ready_regions, state.empty, state.hash)
+
+
+@pytest.mark.parametrize("propagation", [False, True])
+@pytest.mark.parametrize("m, n, fill", [(2, 2, 0.3), (2, 3, 0.5), (3, 3, 0.6)])
+def test_undo_restores_the_state(m, n, fill, propagation):
+    for seed in range(4):
+        state = SearchState(random_position(m, n, fill, seed), propagation)
+        state.propagate()
+        generator = random.Random(seed)
+        stack = []
+        while True:
+            moves = state.legal_moves()
+            if not moves:
+                break
+            stack.append(fields(state))
+            state.apply(generator.choice(moves))
+            state.propagate()
+        while stack:
+            state.undo()
+            assert fields(state) == stack.pop()
@@ -0,0 +1,76 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Positions that are a symmetry of each other must get the same canonical key,
+# and corresponding moves the same canonical move. Rows (columns) with equal
+# masks keep their order in the canonical form (see symmetry.py), so the
+# permuted boards are only compared when all row and column masks differ;
+# transposition does not depend on the order and is compared always.
+
+import random
+
+import pytest
+
+from ..positions import random_position
+from ..symmetry import board_symmetry
+
+
+def random_transform(m: int, n: int, generator: random.Random):
+    """ Returns (rows, columns, transposed): a random symmetry of the board, with rows[i] the original row of i """
+    bands = generator.sample(range(n), n)
+    rows = [band * m + row for band in bands for row in generator.sample(range(m), m)]
+    stacks = generator.sample(range(m), m)
+    columns = [stack * n + column for stack in stacks for column in generator.sample(range(n), n)]
+    return rows, columns, m == n and generator.random() < 0.5
+
+
+def transform_square(k: int, transform, N: int) -> int:
+    """ Returns the square that square k is moved to by transform """
+    rows, columns, transposed = transform
+    i, j = rows.index(k // N), columns.index(k % N)
+    return j * N + i if transposed else i * N + j
+
+
+def line_masks(squares, N: int):
+    """ Returns the masks of the values used in the rows and in the columns """
+    rows, columns = [0] * N, [0] * N
+    for k, value in enumerate(squares):
+        if value:
+            rows[k // N] |= 1 << (value - 1)
+            columns[k % N] |= 1 << (value - 1)
+    return rows, columns
+
+
+@pytest.mark.parametrize("m, n", [(2, 2), (2, 3), (3, 3), (3, 4)])
+def test_symmetric_positions_share_the_key(m, n):
+    symmetry = board_symmetry(m, n)
+    N = m * n
+    generator = random.Random(f"{m}x{n}")
+    compared = 0
+    for seed in range(40):
+        squares = random_position(m, n, generator.choice([0.5, 0.7, 0.9]), seed).board.squares
+        rows, columns = line_masks(squares, N)
+        distinct = len(set(rows)) == N and len(set(columns)) == N
+        taboo = [(k, 1) for k in range(N * N) if not squares[k]][:2]
+        transform = random_transform(m, n, generator)
+        if not distinct:
+            # only transpose
+            transform = (list(range(N)), list(range(N)), m == n)
+            if m != n:
+                continue
+        moved = [0] * (N * N)
+        for k, value in enumerate(squares):
+            moved[transform_square(k, transform, N)] = value
+        moved_taboo = [(transform_square(k, transform, N), value) for (k, value) in taboo]
+
+        key, frame = symmetry.board_key(squares, 3, taboo)
+        moved_key, moved_frame = symmetry.board_key(moved, 3, moved_taboo)
+        assert key == moved_key, seed
+        for k in range(N * N):
+            move = (k, 1 + k % N)
+            canonical = symmetry.to_canonical(move, frame)
+            assert symmetry.to_canonical((transform_square(k, transform, N), move[1]), moved_frame) == canonical
+            assert symmetry.from_canonical(canonical, frame) == move
+        compared += 1
+    assert compared
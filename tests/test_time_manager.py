@@ -0,0 +1,54 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The prediction of the next depth by the time manager.
+
+import time
+
+from ..time_manager import TimeManager
+
+
+def clock(elapsed: float, iterations, budget: float = 10.0) -> TimeManager:
+    """ Returns a started quiet clock (target 6.75 s, deadline 9 s) that has run for elapsed seconds """
+    manager = TimeManager(budget)
+    manager.start()
+    shift = elapsed + 0.01
+    manager.start_time -= shift
+    manager.target -= shift
+    manager.deadline -= shift
+    manager.iterations = list(iterations)
+    return manager
+
+
+def test_branching_factor():
+    assert clock(0, []).branching_factor() == 0.0
+    assert clock(0, [(10, 0.1)]).branching_factor() == 0.0
+    # one ply after two depths, two plies after three
+    assert clock(0, [(10, 0.1), (50, 0.5)]).branching_factor() == 5.0
+    assert clock(0, [(10, 0.1), (50, 0.5), (1000, 1.0)]).branching_factor() == 10.0
+    assert clock(0, [(10, 0.1), (5, 0.1)]).branching_factor() == 1.0
+
+
+def test_start_iteration():
+    # no prediction yet
+    assert clock(0.5, [(10, 0.5)]).start_iteration(0)
+    # fits in the target time
+    assert clock(1.0, [(10, 0.1), (50, 0.5)]).start_iteration(0)
+    # past the target, but most of it is left and it ends before the deadline
+    assert clock(1.0, [(10, 0.1), (100, 0.6)]).start_iteration(0)
+    # past the deadline: not started, however much time is left
+    assert not clock(1.0, [(10, 0.1), (200, 1.0)]).start_iteration(0)
+    # past the target, with less than half of it left
+    assert not clock(5.0, [(10, 0.1), (20, 0.3), (40, 0.9)]).start_iteration(0)
+    # no depth is started after the deadline
+    assert not clock(9.5, [(10, 0.1)]).start_iteration(0)
+
+
+def test_deadline_polling():
+    manager = TimeManager(0.01, check_interval=4)
+    manager.start()
+    time.sleep(0.02)
+    # the clock is only read every check_interval calls
+    assert [manager.out_of_time() for _ in range(4)] == [False, False, False, True]
+    assert manager.out_of_time()
@@ -0,0 +1,39 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The Elo difference of a result and its confidence interval: finite for any
+# result, so the report is valid JSON, and symmetric between the two players.
+
+import json
+import math
+
+import pytest
+
+from ..tournament import elo, elo_interval, format_elo
+
+
+def test_elo():
+    assert elo(0.5) == 0
+    assert elo(0.75) == pytest.approx(-400 * math.log10(1 / 3))
+    assert elo(0.25) == pytest.approx(-elo(0.75))
+
+
+@pytest.mark.parametrize("wins, draws, losses", [(10, 0, 0), (0, 0, 10), (0, 3, 0), (1, 0, 0), (6, 2, 2)])
+def test_interval_is_finite(wins, draws, losses):
+    value, low, high = elo_interval(wins, draws, losses)
+    assert low <= value <= high
+    json.dumps({"elo": [value, low, high]}, allow_nan=False)
+    assert "inf" not in format_elo((value, low, high))
+    mirrored = elo_interval(losses, draws, wins)
+    assert mirrored == pytest.approx((-value, -high, -low))
+
+
+def test_extreme_scores_count_half_a_game_less():
+    assert elo_interval(10, 0, 0)[0] == pytest.approx(elo(19 / 20))
+    assert elo_interval(0, 0, 10)[0] == pytest.approx(elo(1 / 20))
+
+
+def test_format_elo():
+    assert format_elo(None) == "-"
+    assert format_elo((-0.4, -120.6, 119.5)) == "+0 [-121, +120]"
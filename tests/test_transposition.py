@@ -0,0 +1,65 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# The replacement scheme of the transposition table, and the use of its
+# lower and upper bounds by alpha-beta: a search with any window, reusing the
+# entries of earlier searches, must agree with the full-window value.
+
+import random
+
+import pytest
+
+from ..positions import random_position
+from ..search import AlphaBetaSearch
+from ..search_state import SearchState
+from ..transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+
+def test_depth_preferred_and_always_replace_slots():
+    tt = TranspositionTable(16)
+    stride = tt.mask + 1  # keys that differ by a multiple of stride share a bucket
+    first, second, third = 5, 5 + stride, 5 + 2 * stride
+    tt.store(first, 3, EXACT, 1, (0, 1))
+    tt.store(second, 1, LOWER, 2, (1, 1))
+    # the shallower entry goes to the always-replace slot, the deep one stays
+    assert tt.probe(first) == (3, EXACT, 1, (0, 1))
+    assert tt.probe(second) == (1, LOWER, 2, (1, 1))
+    tt.store(third, 2, UPPER, 3, None)
+    # the always-replace slot is overwritten
+    assert tt.probe(second) is None
+    assert tt.probe(third) == (2, UPPER, 3, None)
+    tt.store(second, 4, EXACT, 4, (2, 1))
+    # a deeper entry takes the depth-preferred slot and the old deep entry moves down
+    assert tt.probe(second) == (4, EXACT, 4, (2, 1))
+    assert tt.probe(first) == (3, EXACT, 1, (0, 1))
+    assert tt.probe(third) is None
+    # storing the same position again leaves no stale copy behind
+    tt.store(first, 5, EXACT, 6, (3, 1))
+    assert tt.probe(first) == (5, EXACT, 6, (3, 1))
+    assert tt.probe(second) == (4, EXACT, 4, (2, 1))
+
+
+@pytest.mark.parametrize("m, n, fill", [(2, 2, 0.3), (2, 3, 0.6)])
+def test_bounds_agree_with_the_full_window(m, n, fill):
+    generator = random.Random(f"{m}x{n}")
+    for seed in range(3):
+        game_state = random_position(m, n, fill, seed)
+        for depth in (2, 3):
+            reference = AlphaBetaSearch(lambda i, j, value: None, 1e9)
+            state = SearchState(game_state, reference.propagation)
+            reference.start(state)
+            exact = reference.alpha_beta(state, depth, float("-inf"), float("inf"))
+
+            search = AlphaBetaSearch(lambda i, j, value: None, 1e9)
+            search.start(state)
+            for _ in range(12):
+                alpha = exact + generator.randint(-4, 3)
+                beta = alpha + generator.choice([1, 1, 2, 5])
+                value = search.alpha_beta(state, depth, alpha, beta)
+                if value <= alpha:
+                    assert exact <= alpha and value >= exact, (seed, depth, alpha, beta, value)
+                elif value >= beta:
+                    assert exact >= beta and value <= exact, (seed, depth, alpha, beta, value)
+                else:
+                    assert value == exact, (seed, depth, alpha, beta, value)
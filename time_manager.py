@@ -0,0 +1,98 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Time management for the iterative deepening search.
+#
+# - The clock is only read every check_interval nodes; in between, polling the
+#   deadline is a counter decrement.
+# - After every completed depth the effective branching factor (growth of the
+#   node count per depth) predicts how long the next depth will take. A depth
+#   that cannot finish before the target time is not started. The growth is
+#   measured over two plies once three depths have completed, and over one ply
+#   after two. That one-ply estimate is noisy, so while more than half of the
+#   target time remains a depth is started anyway, unless it is predicted to
+#   run past the deadline itself.
+# - The target time depends on the game phase: when a region has only one or
+#   two empty squares, moves are worth points soon and the whole budget may be
+#   used; in quiet positions the search stops starting new depths earlier.
+
+import time
+
+
+class TimeManager(object):
+    """
+    Per-move time budget with cheap deadline polling and prediction of the next deepening iteration.
+    """
+
+    def __init__(self, budget: float, check_interval: int = 256, safety: float = 0.9,
+                 quiet_share: float = 0.75, critical_share: float = 1.0):
+        self.budget = budget  # real time limit per move in seconds
+        self.check_interval = check_interval
+        self.safety = safety  # fraction of the budget that may be used at all (the rest is margin)
+        self.quiet_share = quiet_share  # fraction of the usable time to start new depths in quiet positions
+        self.critical_share = critical_share  # same, in positions where regions are about to be completed
+        self.start_time = 0.0
+        self.deadline = 0.0
+        self.target = 0.0
+        self.countdown = check_interval
+        self.stopped = False
+        self.iterations = []  # (nodes, seconds) of every completed depth
+        self.iteration_start = (0, 0.0)
+
+    def start(self, critical: bool = False) -> None:
+        """ Starts the clock for a new move """
+        self.start_time = time.perf_counter()
+        usable = self.budget * self.safety
+        self.deadline = self.start_time + usable
+        self.target = self.start_time + usable * (self.critical_share if critical else self.quiet_share)
+        self.countdown = self.check_interval
+        self.stopped = False
+        self.iterations = []
+
+    def elapsed(self) -> float:
+        """ Returns the seconds since start() """
+        return time.perf_counter() - self.start_time
+
+    def out_of_time(self) -> bool:
+        """ Returns whether the deadline has passed; reads the clock only every check_interval calls """
+        self.countdown -= 1
+        if self.countdown <= 0:
+            self.countdown = self.check_interval
+            if time.perf_counter() >= self.deadline:
+                self.stopped = True
+        return self.stopped
+
+    def branching_factor(self) -> float:
+        """ Returns the effective branching factor of the last completed depths, or 0.0 if it is unknown; it is
+            measured over two plies when possible, because alpha-beta trees of odd and even depth grow by different
+            factors
+        """
+        iterations = self.iterations
+        if len(iterations) >= 3 and iterations[-3][0]:
+            return max(1.0, (iterations[-1][0] / iterations[-3][0]) ** 0.5)
+        if len(iterations) == 2 and iterations[-2][0]:
+            return max(1.0, iterations[-1][0] / iterations[-2][0])
+        return 0.0
+
+    def start_iteration(self, nodes: int) -> bool:
+        """ Records the start of the next depth (nodes is the search's node counter)
+            and returns whether that depth is expected to finish in time
+        """
+        now = time.perf_counter()
+        self.iteration_start = (nodes, now)
+        if self.stopped or now >= self.deadline:
+            return False
+        if self.iterations:
+            branching_factor = self.branching_factor()
+            finish = now + self.iterations[-1][1] * branching_factor
+            if branching_factor and finish > self.target:
+                # with most of the target time left, only a depth that cannot finish at all is skipped
+                if finish > self.deadline or now - self.start_time >= 0.5 * (self.target - self.start_time):
+                    return False
+        return True
+
+    def iteration_done(self, nodes: int) -> None:
+        """ Records the node count and duration of a completed depth """
+        start_nodes, start_time = self.iteration_start
+        self.iterations.append((nodes - start_nodes, time.perf_counter() - start_time))
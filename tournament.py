@@ -0,0 +1,271 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Self-play tournament between engine variants.
+#
+# Every pair of engines plays every opening of the matrix of board shapes and
+# time controls twice, with the colours swapped, and the games are spread over
+# a process pool. A game is played like in simulate_game.py: every move is
+# computed in a process of its own that is stopped at the time limit (see
+# benchmark.benchmark), and
+#   - a move that is not proposed in time, or is not legal, loses the game,
+#   - a legal move after which the sudoku has no solution is a taboo move: it
+#     is recorded and the turn passes,
+#   - the game ends when no legal move is left; the most points win.
+# An engine is a variant file of this folder, optionally with attributes of
+# its SudokuAI, for instance "sudokuai.py:engine='mcts'".
+#
+# The report gives per engine the score and Elo difference against the field
+# with a 95% confidence interval (a score of 0% or 100% is counted as half a
+# game less extreme, so the Elo stays finite), the same per pair of engines,
+# and the average nodes/sec and depth, the timeouts (moves stopped at the time
+# limit), forfeits and errors of its moves, so strength and speed are
+# measured together. The search memory (see search_memory.py) of every player is kept
+# in a temporary directory of its game, so the memories of parallel games do
+# not mix.
+#
+# Run it from the directory with simulate_game.py, with this team folder as a package:
+#   python -m team05_A1_v2.tournament --engines sudokuai.py "sudokuai.py:engine='mcts'" --seconds 0.5 1
+#   python -m team05_A1_v2.tournament --shapes 2x2 2x3 3x3 --openings 4 --workers 8 --output tournament.json
+
+import argparse
+import ast
+import itertools
+import json
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from competitive_sudoku.sudoku import Move, TabooMove
+from .benchmark import benchmark, load_variant
+from .candidates import CandidateEngine, mask_values
+from .geometry import board_geometry
+from .positions import random_position
+from .search_state import SearchState
+
+# fill levels of the openings; the first fill is used for the first opening of a shape, and so on
+FILLS = [0.0, 0.1, 0.2, 0.3]
+
+
+def parse_engine(engine: str):
+    """ Returns (filename, attributes) of an engine given as "file" or "file:name=value,name=value" """
+    filename, _, settings = engine.partition(":")
+    attributes = {}
+    for setting in filter(None, settings.split(",")):
+        name, _, value = setting.partition("=")
+        try:
+            attributes[name.strip()] = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            attributes[name.strip()] = value.strip()
+    return filename, attributes
+
+
+def has_solution(candidates: CandidateEngine) -> bool:
+    """ Returns whether the empty squares can be filled in; backtracks on the square with the fewest candidates """
+    squares = candidates.squares
+    best, best_mask, fewest = None, 0, None
+    for k in range(len(squares)):
+        if squares[k]:
+            continue
+        mask = candidates.candidates(k)
+        if not mask:
+            return False
+        count = bin(mask).count("1")
+        if fewest is None or count < fewest:
+            best, best_mask, fewest = k, mask, count
+            if count == 1:
+                break
+    if best is None:
+        return True
+    for value in mask_values(best_mask):
+        candidates.place(best, value)
+        solved = has_solution(candidates)
+        candidates.remove(best)
+        if solved:
+            return True
+    return False
+
+
+def play_game(engines, m: int, n: int, fill: float, seed: int, seconds: float) -> dict:
+    """ Plays a game between engines (first player, second player) and returns its result and move statistics """
+    game_state = random_position(m, n, fill, seed)
+    geometry = board_geometry(m, n)
+    parsed = [parse_engine(engine) for engine in engines]
+    # like the framework, import the engines before the move processes are started from this one, so the imports
+    # do not count against the time of a move
+    for (filename, _) in parsed:
+        load_variant(filename)
+    # per player: moves, nodes/sec and depth totals (of the moves that report them), timeouts and errors
+    stats = [{"moves": 0, "nps_moves": 0, "nodes_per_second": 0.0, "depth_moves": 0, "depth": 0, "timeouts": 0,
+              "errors": 0, "taboo": 0} for _ in engines]
+    forfeit = None
+    with tempfile.TemporaryDirectory() as game_directory:
+        while True:
+            state = SearchState(game_state)
+            if not state.legal_moves():
+                break
+            player = state.ply % 2
+            filename, attributes = parsed[player]
+            # unlike a benchmark run, a player keeps its search memory between its moves, in a file of this game
+            settings = {"persistent": True,
+                        "memory_file": os.path.join(game_directory, f"search_memory_{player + 1}.pkl")}
+            settings.update(attributes, player_number=player + 1)
+            run = benchmark(filename, f"{m}x{n}", game_state, seconds, settings)
+            totals = stats[player]
+            totals["moves"] += 1
+            totals["timeouts"] += not run["completed"] and run["error"] is None
+            totals["errors"] += run["error"] is not None
+            if run["nodes_per_second"] is not None:
+                totals["nps_moves"] += 1
+                totals["nodes_per_second"] += run["nodes_per_second"]
+            if run["depth"] is not None:
+                totals["depth_moves"] += 1
+                totals["depth"] += run["depth"]
+
+            if run["final_move"] is None:
+                forfeit = player
+                break
+            i, j, value = run["final_move"]
+            if not (0 <= i < geometry.N and 0 <= j < geometry.N and 1 <= value <= geometry.N) \
+                    or not state.is_legal((geometry.index(i, j), value)):
+                forfeit = player
+                break
+            k = geometry.index(i, j)
+            solution = CandidateEngine(geometry, game_state.board.squares)
+            solution.place(k, value)
+            if has_solution(solution):
+                game_state.scores[player] += state.points(k)
+                game_state.board.put(i, j, value)
+                game_state.moves.append(Move(i, j, value))
+            else:
+                totals["taboo"] += 1
+                game_state.taboo_moves.append(TabooMove(i, j, value))
+                game_state.moves.append(TabooMove(i, j, value))
+
+    if forfeit is not None:
+        winner = 1 - forfeit
+    elif game_state.scores[0] != game_state.scores[1]:
+        winner = 0 if game_state.scores[0] > game_state.scores[1] else 1
+    else:
+        winner = None
+    return {"engines": list(engines), "shape": f"{m}x{n}", "fill": fill, "seed": seed, "seconds": seconds,
+            "scores": list(game_state.scores), "winner": winner, "forfeit": forfeit, "stats": stats}
+
+
+def elo(score: float) -> float:
+    """ Returns the Elo difference that corresponds to the expected score (0..1) """
+    if score <= 0:
+        return float("-inf")
+    if score >= 1:
+        return float("inf")
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_interval(wins: int, draws: int, losses: int, z: float = 1.96):
+    """ Returns (elo, low, high): the Elo difference of a result and its confidence interval (normal approximation
+        of the mean score per game)
+    """
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = z * math.sqrt(variance / games)
+    # a score of 0 or 1 has an infinite Elo difference (and no variance): the scores are kept half a game away
+    # from the extremes
+    low, high = 1 / (2 * games), 1 - 1 / (2 * games)
+    return tuple(elo(min(high, max(low, value))) for value in (score, score - margin, score + margin))
+
+
+def summarize(games, engines) -> dict:
+    """ Returns per engine and per pair of engines the results, and per engine the move statistics """
+    results = {engine: [0, 0, 0] for engine in engines}  # engine -> [wins, draws, losses]
+    pairs = {}  # (engine, opponent) -> [wins, draws, losses]
+    moves = {engine: {} for engine in engines}
+    for game in games:
+        for player in (0, 1):
+            engine, opponent = game["engines"][player], game["engines"][1 - player]
+            outcome = 1 if game["winner"] is None else 0 if game["winner"] == player else 2
+            results[engine][outcome] += 1
+            pairs.setdefault((engine, opponent), [0, 0, 0])[outcome] += 1
+            for (name, value) in game["stats"][player].items():
+                moves[engine][name] = moves[engine].get(name, 0) + value
+            moves[engine]["forfeits"] = moves[engine].get("forfeits", 0) + (game["forfeit"] == player)
+
+    summary = {"engines": {}, "pairs": []}
+    for engine in engines:
+        wins, draws, losses = results[engine]
+        totals = moves[engine]
+        summary["engines"][engine] = {
+            "games": wins + draws + losses, "wins": wins, "draws": draws, "losses": losses,
+            "elo": elo_interval(wins, draws, losses) if wins + draws + losses else None,
+            "moves": totals.get("moves", 0),
+            "nodes_per_second": totals["nodes_per_second"] / totals["nps_moves"] if totals.get("nps_moves") else None,
+            "depth": totals["depth"] / totals["depth_moves"] if totals.get("depth_moves") else None,
+            "timeouts": totals.get("timeouts", 0), "forfeits": totals.get("forfeits", 0),
+            "errors": totals.get("errors", 0), "taboo": totals.get("taboo", 0)}
+    for ((engine, opponent), (wins, draws, losses)) in sorted(pairs.items()):
+        summary["pairs"].append({"engine": engine, "opponent": opponent, "wins": wins, "draws": draws,
+                                 "losses": losses, "elo": elo_interval(wins, draws, losses)})
+    return summary
+
+
+def format_elo(interval) -> str:
+    """ Returns an Elo interval as text """
+    if interval is None:
+        return "-"
+    value, low, high = (round(value) for value in interval)  # integers, so that -0.4 is not shown as -0
+    return f"{value:+d} [{low:+d}, {high:+d}]"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play tournament between engine variants")
+    parser.add_argument("--engines", nargs="+", default=["sudokuai.py", "final_A2.py"],
+                        help="variant files of this folder, optionally with attributes: file:name=value,name=value")
+    parser.add_argument("--shapes", nargs="+", default=["2x2", "2x3", "3x3"], help="block shapes as mxn")
+    parser.add_argument("--seconds", nargs="+", type=float, default=[0.5], help="time controls: seconds per move")
+    parser.add_argument("--openings", type=int, default=2, help="openings per shape, each played with both colours")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="games played at the same time")
+    parser.add_argument("--output", default="tournament_report.json", help="JSON report to write")
+    args = parser.parse_args()
+
+    shapes = [tuple(int(size) for size in shape.split("x")) for shape in args.shapes]
+    matches = []
+    for (first, second) in itertools.combinations(args.engines, 2):
+        for ((m, n), seconds, opening) in itertools.product(shapes, args.seconds, range(args.openings)):
+            fill = FILLS[opening % len(FILLS)]
+            # the same opening with the colours swapped
+            matches.append(((first, second), m, n, fill, opening, seconds))
+            matches.append(((second, first), m, n, fill, opening, seconds))
+
+    games = []
+    with ProcessPoolExecutor(max(1, args.workers)) as pool:
+        for game in pool.map(play_game, *zip(*matches)):
+            games.append(game)
+            result = "draw" if game["winner"] is None else f"{game['engines'][game['winner']]} wins"
+            print(f"{game['shape']:>5} {game['seconds']:>5}s fill {game['fill']:.1f} {game['engines'][0]} - "
+                  f"{game['engines'][1]} {game['scores'][0]}-{game['scores'][1]} {result}"
+                  + (" (forfeit)" if game["forfeit"] is not None else ""))
+
+    summary = summarize(games, args.engines)
+    print(f"{'engine':>32} {'games':>5} {'w/d/l':>9} {'elo vs field [95%]':>20} {'nodes/sec':>9} {'depth':>5} "
+          f"{'timeouts':>8} {'forfeits':>8} {'errors':>6}")
+    for (engine, row) in summary["engines"].items():
+        nps = f"{row['nodes_per_second']:.0f}" if row["nodes_per_second"] is not None else "-"
+        depth = f"{row['depth']:.1f}" if row["depth"] is not None else "-"
+        print(f"{engine:>32} {row['games']:>5} {row['wins']:>3}/{row['draws']}/{row['losses']:<3} "
+              f"{format_elo(row['elo']):>20} {nps:>9} {depth:>5} {row['timeouts']:>8} {row['forfeits']:>8} "
+              f"{row['errors']:>6}")
+    for pair in summary["pairs"]:
+        print(f"{pair['engine']:>32} vs {pair['opponent']:<32} {pair['wins']}/{pair['draws']}/{pair['losses']} "
+              f"elo {format_elo(pair['elo'])}")
+
+    with open(args.output, "w") as file:
+        json.dump({"engines": args.engines, "shapes": args.shapes, "seconds": args.seconds,
+                   "openings": args.openings, "games": games, "summary": summary}, file, indent=2,
+                  allow_nan=False)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Transposition table for the alpha-beta search.
+#
+# Entries are keyed by the Zobrist hash of the position (board contents and
+# side to move) and hold (key, depth, bound type, value, best move). The table
+# has a fixed number of buckets with two slots each:
+#   - slot 0 is depth-preferred: it keeps the deepest search of the bucket,
+#   - slot 1 is always-replace: it keeps the most recent other entry,
+# so the memory use is bounded however long the game runs.
+#
+# snapshot() / restore() carry the entries of the expected continuation of
+# the game over to the search of the next move (see search_memory.py).
+
+# bound types
+EXACT = 0  # value is the exact minimax value
+LOWER = 1  # value is a lower bound (the search failed high)
+UPPER = 2  # value is an upper bound (the search failed low)
+
+
+class TranspositionTable(object):
+    """
+    Two-tier (depth-preferred / always-replace) hash table of search results.
+    """
+
+    def __init__(self, max_entries: int = 1 << 17):
+        # number of buckets: the largest power of two with 2 * buckets <= max_entries
+        buckets = 1
+        while 4 * buckets <= max_entries:
+            buckets *= 2
+        self.mask = buckets - 1
+        self.slots = [None] * (2 * buckets)  # slot 2b is depth-preferred, slot 2b+1 always-replace
+
+        # statistics
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0  # probes that found the bucket occupied by other positions only
+        self.stores = 0
+        self.replacements = 0  # stores that overwrote an entry of another position
+
+    def probe(self, key: int):
+        """ Returns (depth, bound type, value, best move) stored for key, or None """
+        self.probes += 1
+        index = 2 * (key & self.mask)
+        slots = self.slots
+        for entry in (slots[index], slots[index + 1]):
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1:]
+        if slots[index] is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, bound: int, value, move) -> None:
+        """ Stores a search result, keeping the deepest entry of the bucket in the depth-preferred slot """
+        self.stores += 1
+        index = 2 * (key & self.mask)
+        slots = self.slots
+        entry = (key, depth, bound, value, move)
+        preferred = slots[index]
+        if preferred is None or preferred[0] == key or depth >= preferred[1]:
+            if preferred is not None and preferred[0] != key:
+                # the older deep entry moves down to the always-replace slot
+                if slots[index + 1] is not None and slots[index + 1][0] != key:
+                    self.replacements += 1
+                slots[index + 1] = preferred
+            elif slots[index + 1] is not None and slots[index + 1][0] == key:
+                slots[index + 1] = None  # do not keep a stale copy of the same position
+            slots[index] = entry
+        else:
+            if slots[index + 1] is not None and slots[index + 1][0] != key:
+                self.replacements += 1
+            slots[index + 1] = entry
+
+    def snapshot(self, keys) -> list:
+        """ Returns the entries stored for keys as a picklable list (the statistics are not updated) """
+        entries, slots, mask = [], self.slots, self.mask
+        for key in set(keys):
+            index = 2 * (key & mask)
+            for entry in (slots[index], slots[index + 1]):
+                if entry is not None and entry[0] == key:
+                    entries.append(entry)
+                    break
+        return entries
+
+    def restore(self, entries) -> None:
+        """ Stores the entries returned by snapshot() """
+        for entry in entries:
+            self.store(*entry)
+
+    def clear(self) -> None:
+        """ Removes all entries (the statistics are kept) """
+        self.slots = [None] * len(self.slots)
+
+    def hit_rate(self) -> float:
+        """ Returns the fraction of probes that found an entry """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self) -> dict:
+        """ Returns the counters of the table """
+        return {"probes": self.probes, "hits": self.hits, "hit_rate": self.hit_rate(),
+                "collisions": self.collisions, "stores": self.stores, "replacements": self.replacements,
+                "capacity": len(self.slots)}
@@ -0,0 +1,55 @@
+#  (C) Copyright Wieger Wesselink 2021. Distributed under the GPL-3.0-or-later
+#  Software License, (See accompanying file LICENSE or copy at
+#  https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Zobrist keys for hashing board contents and the side to move.
+#
+# Every (cell, value) pair gets a random 64-bit key; the hash of a position is
+# the XOR of the keys of its filled cells, XOR-ed with side_key when the second
+# player is to move. Placing or removing a value changes the hash by a single
+# XOR, so the search state can keep it up to date incrementally. The keys are
+# drawn from a generator seeded with the board shape, so hashes are the same in
+# every process (the opening book relies on that).
+
+import random
+from .geometry import BoardGeometry
+
+
+class ZobristKeys(object):
+    """
+    Random keys for all (cell, value) pairs of a board shape.
+    """
+
+    def __init__(self, geometry: BoardGeometry):
+        N = geometry.N
+        generator = random.Random(f"zobrist-{geometry.m}x{geometry.n}")
+        self.N = N
+        # cell_value[k * (N + 1) + value]; value 0 (empty) has key 0
+        self.cell_value = [0 if value == 0 else generator.getrandbits(64)
+                           for k in range(geometry.size) for value in range(N + 1)]
+        self.side_key = generator.getrandbits(64)
+
+    def key(self, k: int, value: int) -> int:
+        """ Returns the key of value written in cell k """
+        return self.cell_value[k * (self.N + 1) + value]
+
+    def hash_board(self, squares, ply: int) -> int:
+        """ Returns the hash of a board with ply moves played """
+        h = self.side_key if ply % 2 else 0
+        stride, cell_value = self.N + 1, self.cell_value
+        for k, value in enumerate(squares):
+            if value:
+                h ^= cell_value[k * stride + value]
+        return h
+
+
+# module level cache: (m, n) -> ZobristKeys
+_keys = {}
+
+
+def zobrist_keys(geometry: BoardGeometry) -> ZobristKeys:
+    """ Returns the (cached) Zobrist keys of a board shape """
+    keys = _keys.get((geometry.m, geometry.n))
+    if keys is None:
+        keys = _keys[(geometry.m, geometry.n)] = ZobristKeys(geometry)
+    return keys